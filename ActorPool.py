@@ -0,0 +1,118 @@
+import random
+import multiprocessing as mp
+from multiprocessing.connection import wait
+import numpy as np
+
+from LunarLanderEnvironment import LunarLanderEnvironment
+from Policy import Policy
+
+#===========================================================================================
+### Worker
+#===========================================================================================
+## Runs in its own process: owns one environment, acts with the latest weights it has been sent and streams
+## transitions back to the learner in chunks of sendEvery. Never imports TensorFlow.
+def actorWorker(conn, maxSteps, sendEvery, seed, test, actionRepeat):
+    random.seed(seed)
+    np.random.seed(seed)
+
+    env = LunarLanderEnvironment(seed=seed, actionRepeat=actionRepeat)
+    policy = Policy()
+    stateSize = env.stateSpaceSize
+
+    ## Block until the first policy arrives
+    message = conn.recv()
+    if message[0] == 'stop':
+        return
+    _, weights, epsilon = message
+    policy.setWeights(weights)
+
+    states = np.zeros((sendEvery, stateSize), dtype=np.float32)
+    actions = np.zeros(sendEvery, dtype=np.int64)
+    rewards = np.zeros(sendEvery, dtype=np.float32)
+    nextStates = np.zeros((sendEvery, stateSize), dtype=np.float32)
+    dones = np.zeros(sendEvery, dtype=np.bool_)
+    episodeInfos = []
+
+    nextState = env.reset(test=test)
+    step = 0
+    epReward = 0
+    n = 0
+    while True:
+        state = nextState
+        action = policy.selectAction(state, epsilon)
+        nextState, reward, done, info = env.step(action, step, maxSteps)
+        step += 1
+        epReward += reward
+
+        states[n], actions[n], rewards[n], nextStates[n], dones[n] = state, action, reward, nextState, done
+        n += 1
+
+        if done:
+            info['episodeSteps'] = step
+            info['episodeReward'] = epReward
+            episodeInfos.append(info)
+            nextState = env.reset(test=test)
+            step = 0
+            epReward = 0
+
+        if n == sendEvery:
+            conn.send(('transitions', states, actions, rewards, nextStates, dones, episodeInfos))
+            n = 0
+            episodeInfos = []
+            ## Pick up the newest policy, dropping any older ones still queued
+            while conn.poll():
+                message = conn.recv()
+                if message[0] == 'stop':
+                    return
+                _, weights, epsilon = message
+                policy.setWeights(weights)
+
+#===========================================================================================
+### Classes
+#===========================================================================================
+class ActorPool():
+    ## Experience collection across numActors worker processes. The learner calls broadcast() with fresh
+    ## weights and collect() to move whatever the actors have produced into its replay memory.
+    def __init__(self, numActors, maxSteps, sendEvery=64, seed=0, test=False, actionRepeat=1):
+        self.numActors = numActors
+        context = mp.get_context('spawn') ## Forking a process that has initialised TensorFlow is unsafe
+        self.conns = []
+        self.processes = []
+        for i in range(numActors):
+            learnerConn, actorConn = context.Pipe()
+            process = context.Process(target=actorWorker, args=(actorConn, maxSteps, sendEvery, seed + i, test, actionRepeat), daemon=True)
+            process.start()
+            actorConn.close()
+            self.conns.append(learnerConn)
+            self.processes.append(process)
+
+    def broadcast(self, weights, epsilon):
+        for conn in self.conns:
+            conn.send(('weights', weights, epsilon))
+
+    def collect(self, agent, timeout=None): ## Waits up to timeout for at least one chunk, returns finished episode infos
+        episodeInfos = []
+        for conn in wait(self.conns, timeout):
+            while conn.poll():
+                _, states, actions, rewards, nextStates, dones, infos = conn.recv()
+                agent.rememberBatch(states, actions, rewards, nextStates, dones, streams=self.conns.index(conn)) ## Each actor's chunks are one stream, in order
+                episodeInfos.extend(infos)
+        return episodeInfos
+
+    def close(self):
+        for conn in self.conns:
+            try:
+                conn.send(('stop',))
+            except (BrokenPipeError, OSError):
+                pass
+        for conn, process in zip(self.conns, self.processes):
+            ## Drain so a worker blocked on send() can see the stop message
+            try:
+                while process.is_alive() and conn.poll(0.1):
+                    conn.recv()
+            except EOFError:
+                pass
+            process.join(timeout=1)
+            if process.is_alive():
+                process.terminate()
+            conn.close()
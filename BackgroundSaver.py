@@ -0,0 +1,81 @@
+import os
+import shutil
+import threading
+
+#===========================================================================================
+### Classes
+#===========================================================================================
+class BackgroundSaver():
+    ## Writes checkpoints from a worker thread so training never waits on HDF5 serialisation. The learner hands over a
+    ## get_weights() snapshot, the worker loads it into its own copy of the model and writes it to a temp file that is
+    ## renamed into place, so a checkpoint on disk is always complete. At most one save is pending: a newer save
+    ## replaces an older one that has not started yet, so a slow disk coalesces saves instead of queueing them.
+    ## A memory-mapped replayMemory is flushed after each checkpoint, so the replay on disk keeps up with the models.
+    def __init__(self, model, registry=None, keepTop=None, replayMemory=None):
+        self.model = model ## Same architecture as the trained model, only ever touched by the worker thread
+        self.registry = registry
+        self.keepTop = keepTop
+        self.replayMemory = replayMemory
+        self.pending = None
+        self.busy = False
+        self.closed = False
+        self.error = None
+        self.coalesced = 0
+        self.condition = threading.Condition()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def save(self, weights, path, config=None, episode=None, score=None): ## weights is a model.get_weights() snapshot
+        with self.condition:
+            if self.error:
+                raise self.error
+            if self.pending is not None:
+                self.coalesced += 1
+            self.pending = (weights, path, config, episode, score)
+            self.condition.notify()
+
+    def run(self):
+        while True:
+            with self.condition:
+                while self.pending is None and not self.closed:
+                    self.condition.wait()
+                if self.pending is None:
+                    return
+                weights, path, config, episode, score = self.pending
+                self.pending = None
+                self.busy = True
+            try:
+                self.write(weights, path)
+                if self.registry is not None:
+                    self.registry.add(path, config, episode, score)
+                    if self.keepTop:
+                        self.registry.prune(config, self.keepTop)
+                if self.replayMemory is not None:
+                    self.replayMemory.flush()
+            except Exception as e:
+                self.error = e
+            with self.condition:
+                self.busy = False
+                self.condition.notify_all()
+
+    def write(self, weights, path):
+        tempPath = path + '.tmp.h5' ## Keras picks HDF5 from the extension, like the shipped checkpoints, readable by Policy without TensorFlow
+        self.model.set_weights(weights)
+        self.model.save(tempPath)
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+        os.replace(tempPath, path)
+
+    def flush(self): ## Blocks until every requested save is on disk
+        with self.condition:
+            while self.pending is not None or self.busy:
+                self.condition.wait()
+        if self.error:
+            raise self.error
+
+    def close(self):
+        self.flush()
+        with self.condition:
+            self.closed = True
+            self.condition.notify()
+        self.thread.join()
@@ -0,0 +1,87 @@
+import os
+import re
+import json
+import time
+import shutil
+
+MANIFEST_NAME = 'manifest.json'
+CHECKPOINT_PATTERN = re.compile(r'^(?P<config>.*)-avg(?P<score>-?[0-9.]+(?:e[-+]?[0-9]+)?)avg\.model$') ## Legacy '<config>-avg<score>avg.model' names
+
+#===========================================================================================
+### Classes
+#===========================================================================================
+class CheckpointRegistry():
+    ## Manifest of every saved model in a directory, indexed by config (the MODEL_NAME string), with episode, eval score
+    ## and timestamp, so finding the best model or listing checkpoints never parses filenames or opens HDF5 files
+    def __init__(self, directory='./lunar_lander_models'):
+        self.directory = directory
+        self.manifestPath = os.path.join(directory, MANIFEST_NAME)
+        self.entries = [] ## Dicts with file (relative to directory), path, config, episode, score, timestamp, and imported if True
+        self.bestByConfig = {} ## config: entry with the highest score
+        if os.path.isfile(self.manifestPath):
+            with open(self.manifestPath) as f:
+                self.entries = json.load(f)['checkpoints']
+            for entry in self.entries:
+                entry['path'] = os.path.join(directory, entry['file'])
+                if entry['episode'] is None: ## Imported into a manifest written before imports were marked
+                    entry['imported'] = True
+            self.reindex()
+        else:
+            self.importExisting()
+
+    def reindex(self):
+        self.bestByConfig = {}
+        for entry in self.entries:
+            best = self.bestByConfig.get(entry['config'])
+            if best is None or entry['score'] >= best['score']:
+                self.bestByConfig[entry['config']] = entry
+
+    def importExisting(self):
+        ## Register checkpoints saved before the manifest existed from their filenames. Only in memory: the manifest is
+        ## written by the first add() or prune(), so merely opening a directory never creates files in it. They are marked
+        ## imported so prune() never deletes them: they may be checkpoints shipped with the repo rather than from a run.
+        if not os.path.isdir(self.directory):
+            return
+        for fileName in sorted(os.listdir(self.directory)):
+            match = CHECKPOINT_PATTERN.match(fileName)
+            if match:
+                path = os.path.join(self.directory, fileName)
+                self.entries.append({'file': fileName, 'path': path, 'config': match['config'], 'episode': None, 'score': float(match['score']), 'timestamp': os.path.getmtime(path), 'imported': True})
+        self.reindex()
+
+    def save(self):
+        tempPath = self.manifestPath + '.tmp'
+        with open(tempPath, 'w') as f:
+            json.dump({'checkpoints': [{key: value for key, value in entry.items() if key != 'path'} for entry in self.entries]}, f, indent=1)
+        os.replace(tempPath, self.manifestPath) ## Atomic, readers never see a half-written manifest
+
+    def add(self, path, config, episode, score):
+        entry = {'file': os.path.relpath(path, self.directory), 'path': path, 'config': config, 'episode': episode, 'score': float(score), 'timestamp': time.time()}
+        self.entries = [existing for existing in self.entries if existing['path'] != path] + [entry]
+        best = self.bestByConfig.get(config)
+        if best is not None and best['path'] == path:
+            self.reindex() ## Overwriting the current best may have lowered its score
+        elif best is None or entry['score'] >= best['score']:
+            self.bestByConfig[config] = entry
+        self.save()
+        return entry
+
+    def best(self, config):
+        return self.bestByConfig.get(config)
+
+    def list(self, config=None): ## Entries sorted best first, optionally only for one config
+        entries = [entry for entry in self.entries if config is None or entry['config'] == config]
+        return sorted(entries, key=lambda entry: entry['score'], reverse=True)
+
+    def prune(self, config, keepTop): ## Deletes all but the keepTop best checkpoints added for config, returns removed entries
+        removed = [entry for entry in self.list(config) if not entry.get('imported')][keepTop:]
+        removedPaths = {entry['path'] for entry in removed}
+        for path in removedPaths:
+            if os.path.isdir(path): ## SavedModel directories
+                shutil.rmtree(path)
+            elif os.path.exists(path):
+                os.remove(path)
+        self.entries = [entry for entry in self.entries if entry['path'] not in removedPaths]
+        if removed:
+            self.save()
+        return removed
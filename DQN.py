@@ -0,0 +1,176 @@
+import random
+import numpy as np
+import tensorflow as tf
+from tensorflow.keras import models, layers, optimizers
+
+from ReplayBuffer import ReplayBuffer, PrioritizedReplayBuffer
+from Policy import loadKerasWeights, isDuelingHead
+
+#===========================================================================================
+### Default hyperparameters (the training scripts pass their own SETTING block)
+#===========================================================================================
+ALPHA = 0.00085
+GAMMA = 0.984
+REPLAY_MEMORY_SIZE = 10_000
+REPLAY_BATCH_SIZE = 64
+HIDDEN_LAYERS = (18, 32)
+PRIORITIZED_REPLAY = False
+PER_ALPHA = 0.6
+PER_BETA = 0.4
+PER_BETA_INCREMENT = 0.0005
+DOUBLE_DQN = False
+DUELING = False
+N_STEPS = 1
+UPDATE_RATIO = 1 / 64
+TARGET_UPDATE = 'hard'
+TARGET_UPDATE_EVERY = 60
+TAU = 0.01
+
+#===========================================================================================
+### Helper functions
+#===========================================================================================
+## Target network updates as single graph calls on the variables themselves, no get_weights()/set_weights() host copies
+@tf.function
+def copyVariables(targets, sources):
+    for target, source in zip(targets, sources):
+        target.assign(source)
+
+@tf.function
+def blendVariables(targets, sources, tau): ## Polyak averaging: target += tau * (source - target)
+    for target, source in zip(targets, sources):
+        target.assign_add(tau * (source - target))
+
+def tfVariables(model): ## Keras 3 wraps each tf.Variable in its own Variable, which a tf.function cannot assign to
+    return [weight if isinstance(weight, tf.Variable) else weight.value for weight in model.weights]
+
+#===========================================================================================
+### Classes
+#===========================================================================================
+class DQN():
+    def __init__(self, numInputs, numOutputs, loadModel=None, alpha=ALPHA, gamma=GAMMA, replayMemorySize=REPLAY_MEMORY_SIZE, replayBatchSize=REPLAY_BATCH_SIZE, hiddenLayers=HIDDEN_LAYERS, prioritizedReplay=PRIORITIZED_REPLAY, perAlpha=PER_ALPHA, perBeta=PER_BETA, perBetaIncrement=PER_BETA_INCREMENT, replayDirectory=None, doubleDQN=DOUBLE_DQN, dueling=DUELING, nSteps=N_STEPS, updateRatio=UPDATE_RATIO, targetUpdate=TARGET_UPDATE, targetUpdateEvery=TARGET_UPDATE_EVERY, tau=TAU):
+        self.numInputs = numInputs
+        self.numOutputs = numOutputs
+        self.alpha = alpha
+        self.gamma = gamma
+        self.replayMemorySize = replayMemorySize
+        self.replayBatchSize = replayBatchSize
+        self.hiddenLayers = hiddenLayers
+        self.prioritizedReplay = prioritizedReplay
+        self.doubleDQN = doubleDQN ## Bootstrap from the target network's value of the online network's greedy action
+        self.dueling = dueling ## Separate value and advantage heads, only affects models built by createModel
+        self.nSteps = nSteps ## Transitions summed into each return before bootstrapping, followed through the replay memory
+        self.updateRatio = updateRatio ## Gradient steps owed per remembered transition, run by trainPending()
+        if targetUpdate not in ('hard', 'soft'):
+            raise ValueError(f"Unknown target update '{targetUpdate}', expected 'hard' or 'soft'")
+        self.targetUpdate = targetUpdate ## 'hard' copies the online network every targetUpdateEvery gradient steps, 'soft' blends in tau of it after each one
+        self.targetUpdateEvery = targetUpdateEvery
+        self.tau = tf.constant(tau, dtype=tf.float32)
+        self.gradientSteps = 0
+        self.pendingUpdates = 0.0
+        ## replayDirectory keeps the replay memory in memory-mapped files there, picking up whatever was flushed to it before
+        if prioritizedReplay:
+            self.replay_memory = PrioritizedReplayBuffer(replayMemorySize, numInputs, alpha=perAlpha, beta=perBeta, betaIncrement=perBetaIncrement, directory=replayDirectory, linked=nSteps > 1)
+        else:
+            self.replay_memory = ReplayBuffer(replayMemorySize, numInputs, directory=replayDirectory, linked=nSteps > 1)
+        if loadModel:
+            ## Rebuilt by createModel and filled from the checkpoint's stored weights rather than deserialised by Keras, so
+            ## checkpoints load whichever Keras wrote them. Layer sizes and the head follow the checkpoint, whatever was passed.
+            weights, activations = loadKerasWeights(loadModel)
+            kernels = weights[0::2]
+            self.dueling = isDuelingHead(kernels)
+            self.hiddenLayers = tuple(kernel.shape[1] for kernel in kernels[:-2 if self.dueling else -1])
+        self.model = self.createModel()
+        self.targetModel = self.createModel()
+        if loadModel:
+            self.model.set_weights(weights)
+        self.targetModel.set_weights(self.model.get_weights())
+        self.onlineVariables = tfVariables(self.model)
+        self.targetVariables = tfVariables(self.targetModel)
+
+    def createModel(self):
+        if self.dueling:
+            ## Q(s, a) = V(s) + A(s, a) - mean A(s), combined in one weightless Lambda layer since Keras 3 takes no raw TF ops on
+            ## its symbolic tensors. Both heads feed that layer, so get_weights() lists value before advantage, as Policy expects.
+            inputs = layers.Input(shape=(self.numInputs,))
+            hidden = inputs
+            for size in self.hiddenLayers:
+                hidden = layers.Dense(size, activation='tanh')(hidden)
+            value = layers.Dense(1, activation='linear')(hidden)
+            advantage = layers.Dense(self.numOutputs, activation='linear')(hidden)
+            combine = layers.Lambda(lambda heads: heads[0] + heads[1] - tf.reduce_mean(heads[1], axis=1, keepdims=True))
+            model = models.Model(inputs, combine([value, advantage]))
+        else:
+            model = models.Sequential(
+                [layers.Dense(self.hiddenLayers[0], input_dim=self.numInputs, activation='tanh')] +
+                [layers.Dense(size, activation='tanh') for size in self.hiddenLayers[1:]] +
+                [layers.Dense(self.numOutputs, activation='linear')]
+            )
+        model.compile(loss='mse', optimizer=optimizers.Adam(learning_rate=self.alpha), metrics=['accuracy'])
+        return model
+
+    def remember(self, transition, stream=0): ## transition is (state, action, reward, nextState, done)
+        self.replay_memory.add(*transition, stream)
+        self.pendingUpdates += self.updateRatio
+
+    def rememberBatch(self, states, actions, rewards, nextStates, dones, streams=None): ## streams as for ReplayBuffer.addBatch
+        self.replay_memory.addBatch(states, actions, rewards, nextStates, dones, streams)
+        self.pendingUpdates += len(actions) * self.updateRatio
+
+    def selectAction(self, state, epsilon):
+        return random.randrange(self.numOutputs) if (np.random.random() <= epsilon) else np.argmax(self.model.predict_on_batch(np.array([state]))[0])
+
+    def selectActions(self, states, epsilon): ## One forward pass for a whole batch of states, e.g. from VecLunarLander
+        actions = np.argmax(self.model.predict_on_batch(np.asarray(states, dtype=np.float32)), axis=1)
+        explore = np.random.random(len(actions)) <= epsilon
+        actions[explore] = np.random.randint(0, self.numOutputs, size=np.count_nonzero(explore))
+        return actions
+
+    def updateTarget(self):
+        copyVariables(self.targetVariables, self.onlineVariables)
+
+    def softUpdateTarget(self):
+        blendVariables(self.targetVariables, self.onlineVariables, self.tau)
+
+    def computeTargets(self, states, actions, rewards, nextStates, dones, discounts=None):
+        ## One forward pass per network for the whole minibatch instead of two predict() calls per transition.
+        ## discounts is gamma ** (transitions in each return), gamma for 1-step returns.
+        rows = np.arange(len(actions))
+        nextQValues = np.array(self.targetModel.predict_on_batch(nextStates))
+        if self.doubleDQN: ## The online network picks the next action and the target network values it
+            onlineQValues = np.array(self.model.predict_on_batch(np.concatenate([states, nextStates]))) ## Still one online pass
+            qValues = onlineQValues[:len(actions)]
+            nextValues = nextQValues[rows, np.argmax(onlineQValues[len(actions):], axis=1)]
+        else:
+            qValues = np.array(self.model.predict_on_batch(states))
+            nextValues = np.max(nextQValues, axis=1)
+        targets = rewards + (self.gamma if discounts is None else discounts) * nextValues * (1.0 - dones)
+        tdErrors = targets - qValues[rows, actions]
+        qValues[rows, actions] = targets
+        return qValues, tdErrors
+
+    def train(self):
+        if self.prioritizedReplay:
+            indices, weights = self.replay_memory.sampleWeighted(self.replayBatchSize)
+        else:
+            indices, weights = self.replay_memory.sampleIndices(self.replayBatchSize), None
+        states, actions, returns, nextStates, dones, discounts = self.replay_memory.getNStepBatch(indices, self.nSteps, self.gamma)
+        qValues, tdErrors = self.computeTargets(states, actions, returns, nextStates, dones, discounts)
+        self.model.train_on_batch(states, qValues, sample_weight=weights) ## One gradient step, without fit()'s per-call setup
+        if self.prioritizedReplay:
+            self.replay_memory.updatePriorities(indices, tdErrors)
+
+        self.gradientSteps += 1
+        if self.targetUpdate == 'soft':
+            self.softUpdateTarget()
+        elif self.gradientSteps % self.targetUpdateEvery == 0:
+            self.updateTarget()
+
+    def trainPending(self): ## Runs the gradient steps updateRatio owes for the transitions remembered so far, returns how many
+        if len(self.replay_memory) < self.replayBatchSize:
+            self.pendingUpdates = 0.0 ## No credit for the warm-up, the first minibatches would be partial
+            return 0
+        numUpdates = int(self.pendingUpdates)
+        for i in range(numUpdates):
+            self.train()
+        self.pendingUpdates -= numUpdates
+        return numUpdates
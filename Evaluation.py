@@ -0,0 +1,99 @@
+import os
+import math
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+from LunarLanderEnvironment import LunarLanderEnvironment, initialConditionBank
+from Policy import Policy
+
+ABORT_STATUSES = ['safe', 'crashed', 'out_of_bounds', 'time_out']
+
+_policies = {} ## Per worker process cache, path: Policy
+
+#===========================================================================================
+### Helper functions
+#===========================================================================================
+def runEpisode(policy, env, scenario, initialCondition, maxSteps, test=True):
+    nextState = env.reset(test=test, initialCondition=initialCondition) ## Same scenario, same initial condition for every model
+    step = 0
+    epReward = 0
+    done = False
+    while not done:
+        state = nextState
+        action = policy.selectAction(state)
+        nextState, reward, done, info = env.step(action, step, maxSteps)
+        step += 1
+        epReward += reward
+    return {'scenario': scenario, 'reward': epReward, 'avgReward': epReward / step, 'steps': step, 'abortStatus': info['abortStatus']}
+
+## Pool task: run the given (scenario, initialCondition) pairs for one checkpoint (a model path, or a list of weights from get_weights())
+def evaluateScenarios(task):
+    checkpoint, scenarios, maxSteps, test, actionRepeat = task
+    if isinstance(checkpoint, str):
+        if checkpoint not in _policies:
+            _policies[checkpoint] = Policy.load(checkpoint)
+        policy = _policies[checkpoint]
+    else:
+        policy = Policy(checkpoint)
+    env = LunarLanderEnvironment(actionRepeat=actionRepeat)
+    return [runEpisode(policy, env, scenario, initialCondition, maxSteps, test) for scenario, initialCondition in scenarios]
+
+def summarize(episodes):
+    rewards = np.array([episode['avgReward'] for episode in episodes])
+    ci95 = 1.96 * rewards.std(ddof=1) / math.sqrt(len(rewards)) if len(rewards) > 1 else float('nan')
+    landedSteps = [episode['steps'] for episode in episodes if episode['abortStatus'] == 'safe']
+    return {'episodes': len(episodes),
+            'meanAvgReward': float(rewards.mean()),
+            'ci95': float(ci95),
+            'meanEpReward': float(np.mean([episode['reward'] for episode in episodes])),
+            'successRate': len(landedSteps) / len(episodes),
+            'statusCounts': {status: sum(episode['abortStatus'] == status for episode in episodes) for status in ABORT_STATUSES},
+            'meanStepsToLand': float(np.mean(landedSteps)) if landedSteps else None
+            }
+
+#===========================================================================================
+### Evaluation
+#===========================================================================================
+## Runs numEpisodes headless episodes per checkpoint across a process pool, starting from initialConditionBank(numEpisodes, seed).
+## checkpoints is a list of model paths (.model or exported .npz). Returns {checkpoint: summary}.
+def evaluate(checkpoints, numEpisodes=200, seed=0, maxSteps=600, test=True, numWorkers=None, chunkSize=10, actionRepeat=1):
+    scenarios = list(enumerate(initialConditionBank(numEpisodes, seed)))
+    tasks = [(checkpoint, scenarios[i:i + chunkSize], maxSteps, test, actionRepeat) for checkpoint in checkpoints for i in range(0, numEpisodes, chunkSize)]
+    numWorkers = numWorkers or os.cpu_count()
+    if numWorkers > 1:
+        with mp.get_context('spawn').Pool(numWorkers) as pool:
+            results = pool.map(evaluateScenarios, tasks)
+    else:
+        results = [evaluateScenarios(task) for task in tasks]
+
+    episodesByCheckpoint = {checkpoint: [] for checkpoint in checkpoints}
+    for (checkpoint, _, _, _, _), episodes in zip(tasks, results):
+        episodesByCheckpoint[checkpoint].extend(episodes)
+    return {checkpoint: summarize(episodes) for checkpoint, episodes in episodesByCheckpoint.items()}
+
+## Evaluates weight snapshots in a separate process while training carries on.
+## submit() hands over a copy of the weights and returns at once, poll() hands back finished results in submission order.
+class AsyncEvaluator():
+    def __init__(self, numEpisodes=5, seed=0, maxSteps=600, test=False, actionRepeat=1):
+        self.scenarios = list(enumerate(initialConditionBank(numEpisodes, seed))) ## Same scenarios for every snapshot so scores are comparable
+        self.maxSteps = maxSteps
+        self.test = test
+        self.actionRepeat = actionRepeat
+        self.executor = ProcessPoolExecutor(max_workers=1, mp_context=mp.get_context('spawn'))
+        self.pending = [] ## (tag, weights, future)
+
+    def submit(self, weights, tag):
+        weights = [np.array(w, copy=True) for w in weights] ## Snapshot, the learner keeps updating its own arrays
+        future = self.executor.submit(evaluateScenarios, (weights, self.scenarios, self.maxSteps, self.test, self.actionRepeat))
+        self.pending.append((tag, weights, future))
+
+    def poll(self, wait=False): ## Returns [(tag, weights, summary)], wait=True blocks until everything submitted has finished
+        finished = []
+        while self.pending and (wait or self.pending[0][2].done()):
+            tag, weights, future = self.pending.pop(0)
+            finished.append((tag, weights, summarize(future.result())))
+        return finished
+
+    def close(self):
+        self.executor.shutdown(wait=True)
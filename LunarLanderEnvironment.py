@@ -1,11 +1,10 @@
 import numpy as np
 import math
 import random
-import pygame
-from pygame import Vector2
 import pymunk
 from pymunk.vec2d import Vec2d
-from pymunk.pygame_util import DrawOptions
+
+pygame = None ## Imported by LunarLanderEnvironment.renderInit only, so headless training never loads SDL
 
 #===========================================================================================
 ### Global variables
@@ -36,10 +35,20 @@ def toRelativePymunk(center, end):
 
 ## Convert pymunk local coordinates relative a pymunk global center into to pygame global coordinates
 def toAbsolutePygame(center, end):
-    pymunkGlobal = Vector2(center + end)
+    pymunkGlobal = center + end
     pygameGlobal = to_pygame(pymunkGlobal)
     return pygameGlobal
 
+## Draw a lander start position from rng, a random.Random owned by the caller
+def sampleInitialPosition(rng, displayWidth=DISPLAY_WIDTH, displayHeight=DISPLAY_HEIGHT):
+    return (rng.uniform(displayWidth*0.2, displayWidth*0.8), rng.uniform(displayHeight*0.2, displayHeight*0.8))
+
+## Precompute numConditions start positions from seed, an (numConditions, 2) array that reset(initialCondition=...) replays exactly.
+## Benchmarks and evaluations built from the same seed run the same scenarios.
+def initialConditionBank(numConditions, seed=0, displayWidth=DISPLAY_WIDTH, displayHeight=DISPLAY_HEIGHT):
+    rng = random.Random(seed)
+    return np.array([sampleInitialPosition(rng, displayWidth, displayHeight) for i in range(numConditions)], dtype=np.float64)
+
 def limit(value, maximum):
     return value if value <= maximum else maximum
 
@@ -77,6 +86,38 @@ def interpolate(value, leftMin, leftMax, rightMin, rightMax):
 #===========================================================================================
 ### Classes
 #===========================================================================================
+class VelocityHistory():
+    ## Ring of the lander's last `window` velocities in a preallocated array, so memory per environment stays
+    ## constant however long an episode runs
+    def __init__(self, window):
+        self.window = window
+        self.velocities = np.zeros((window, 2), dtype=np.float64)
+        self.index = 0 ## Next write position
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def append(self, velocity): ## velocity is pymunk Vec2d
+        self.velocities[self.index, 0] = velocity.x
+        self.velocities[self.index, 1] = velocity.y
+        self.index = (self.index + 1) % self.window
+        self.count = min(self.count + 1, self.window)
+
+    def clear(self):
+        self.velocities[:] = 0
+        self.index = 0
+        self.count = 0
+
+    def latestSpeed(self):
+        if not self.count:
+            return 0.0
+        vx, vy = self.velocities[self.index - 1]
+        return math.hypot(vx, vy)
+
+    def ordered(self): ## (window, 2) array from oldest to newest, zeros where the episode is younger than the window
+        return np.roll(self.velocities, -self.index, axis=0)
+
 class Platform():
         def __init__(self, space, a, b, radius):
             self.a = a
@@ -93,9 +134,10 @@ class Platform():
             self.shape.friction = 0.4
 
             space.add(self.shape)
+            self.bb = self.shape.cache_bb() ## Static, so its bounding box never changes
 
 class Lander():
-    def __init__(self, space, initPosition):
+    def __init__(self, space, initPosition, velHistoryWindow=4):
 
         # self.pos = initPosition ## Position of lander's center
         # self.vel = Vector2(0, 0)
@@ -113,15 +155,18 @@ class Lander():
         self.module.mass = self.mass
         self.module.friction = 0.3
 
-        self.leftLeg = pymunk.Poly(self.body, [Vec2d(-18, -10), Vec2d(-9, -12.5), Vec2d(-21, -20)])
+        self.leftLegShape = [Vec2d(-18, -10), Vec2d(-9, -12.5), Vec2d(-21, -20)]
+        self.leftLeg = pymunk.Poly(self.body, self.leftLegShape)
         self.leftLeg.mass = 8
         self.leftLeg.friction = 0.8
 
-        self.rightLeg = pymunk.Poly(self.body, [Vec2d(18, -10), Vec2d(9, -12.5), Vec2d(21, -20)])
+        self.rightLegShape = [Vec2d(18, -10), Vec2d(9, -12.5), Vec2d(21, -20)]
+        self.rightLeg = pymunk.Poly(self.body, self.rightLegShape)
         self.rightLeg.mass = 8
         self.rightLeg.friction = 0.8
 
         space.add(self.body, self.module, self.leftLeg, self.rightLeg)
+        self.reach = max(vertex.get_length() for vertex in self.moduleShape + self.leftLegShape + self.rightLegShape) ## No part of the lander is further than this from body.position
 
         self.thrusterForceScale = self.mass / 4
         self.leftThrusterForce = Vec2d(4.6, 0.3) * self.thrusterForceScale ## For tilted side thrust
@@ -136,59 +181,92 @@ class Lander():
         self.rearThrusterShape = [Vec2d(0, 0), Vec2d(-2.5, -2.5), Vec2d(0, -10), Vec2d(2.5, -2.5)]
         self.frontThrusterShape = [Vec2d(0, 0), Vec2d(-2.5, 2.5), Vec2d(0, 10), Vec2d(2.5, 2.5)]
 
-        self.thrusterBools = {'left': False,
-                              'rear': False,
-                              'right': False,
-                              'front': False}
+        self.thrusters = ['left', 'rear', 'right', 'front'] ## Bit i of a thruster bitmask is thrusters[i]
+        self.thrusterBits = 0 ## Thrusters fired since the last displayThrusterForces
+        self.actionImpulses = [] ## Filled by compileActions
 
-        self.velArray = []
+        self.velHistory = VelocityHistory(velHistoryWindow)
 
         self.color = COLORS['LIGHT_BLUE']
         self.thrusterColor = COLORS['ORANGE']
-    
-    def applyDefaultThrust(self, thrusters): ## thrusters is array of strings
-        for thruster in thrusters:
-            if thruster == 'left':
-                # self.body.apply_impulse_at_local_point(self.leftThrusterForce, self.body.center_of_gravity) ## For horizontal side thrust
-                self.body.apply_impulse_at_local_point(self.leftThrusterForce, Vec2d(-15, self.body.center_of_gravity.y)) ## For tilted side thrust
-                self.thrusterBools['left'] = True
-            elif thruster == 'rear':
-                self.body.apply_impulse_at_local_point(self.rearThrusterForce, self.body.center_of_gravity)
-                self.thrusterBools['rear'] = True
-            elif thruster == 'right':
-                # self.body.apply_impulse_at_local_point(self.rightThrusterForce, self.body.center_of_gravity) ## For horizontal side thrust
-                self.body.apply_impulse_at_local_point(self.rightThrusterForce, Vec2d(15, self.body.center_of_gravity.y)) ## For tilted side thrust
-                self.thrusterBools['right'] = True
-            elif thruster == 'front':
-                self.body.apply_impulse_at_local_point(self.frontThrusterForce, self.body.center_of_gravity)
-                self.thrusterBools['front'] = True
+
+    def reset(self, position): ## Put the existing body back at rest, keeping its shapes in the space
+        self.body.angle = 0 ## Before position, chipmunk places the body relative to its current rotation
+        self.body.position = position
+        self.body.velocity = (0, 0)
+        self.body.angular_velocity = 0
+        self.body.force = (0, 0)
+        self.body.torque = 0
+        self.thrusterBits = 0
+        self.velHistory.clear()
+
+    def compileActions(self, actionSpace): ## actionSpace is a list of lists of thruster names
+        ## Sum each action's thruster impulses into one net impulse and one angular impulse about the centre of gravity,
+        ## both in body coordinates, and its thrusters into a bitmask. The net impulse is applied at a point chosen to
+        ## give the same angular impulse, so an action is a single chipmunk call whatever its thrusters.
+        cog = self.body.center_of_gravity
+        thrusterImpulses = {'left': (self.leftThrusterForce, Vec2d(-15, cog.y)), ## For tilted side thrust
+                            # 'left': (self.leftThrusterForce, cog), ## For horizontal side thrust
+                            'rear': (self.rearThrusterForce, cog),
+                            'right': (self.rightThrusterForce, Vec2d(15, cog.y)), ## For tilted side thrust
+                            # 'right': (self.rightThrusterForce, cog), ## For horizontal side thrust
+                            'front': (self.frontThrusterForce, cog)
+                            } ## name: (impulse, point of application)
+        self.actionNetImpulses = np.zeros((len(actionSpace), 2)) ## Rows for batched backends
+        self.actionAngularImpulses = np.zeros(len(actionSpace))
+        self.actionImpulses = [] ## (impulse, local point) per action, None for no thrust
+        self.actionThrusterBits = []
+        for action, thrusters in enumerate(actionSpace):
+            impulse = Vec2d(0, 0)
+            angularImpulse = 0
+            bits = 0
+            for thruster in thrusters:
+                thrusterImpulse, point = thrusterImpulses[thruster]
+                impulse += thrusterImpulse
+                angularImpulse += (point - cog).cross(thrusterImpulse)
+                bits |= 1 << self.thrusters.index(thruster)
+            self.actionNetImpulses[action] = impulse
+            self.actionAngularImpulses[action] = angularImpulse
+            self.actionThrusterBits.append(bits)
+            if len(thrusters) == 1:
+                self.actionImpulses.append((impulse, thrusterImpulses[thrusters[0]][1]))
+            elif impulse.get_length_sqrd() > 0:
+                self.actionImpulses.append((impulse, cog + Vec2d(impulse.y, -impulse.x) * (angularImpulse / impulse.get_length_sqrd()))) ## cross(point - cog, impulse) == angularImpulse
+            elif angularImpulse == 0:
+                self.actionImpulses.append(None)
+            else:
+                raise ValueError(f"Action {thrusters} is a pure couple, which cannot be applied as a single impulse")
+
+    def applyAction(self, action):
+        impulse = self.actionImpulses[action]
+        if impulse is not None:
+            self.body.apply_impulse_at_local_point(*impulse)
+        self.thrusterBits |= self.actionThrusterBits[action]
 
     def displayThrusterForces(self, screen):
-        for key, value in self.thrusterBools.items():
-            if value:
-                if key == 'left':
-                    pygame.draw.polygon(screen, self.thrusterColor, [to_pygame(self.body.position + point) for point in self.leftThrusterShape])
-                elif key == 'right':
-                    pygame.draw.polygon(screen, self.thrusterColor, [to_pygame(self.body.position + point) for point in self.rightThrusterShape])
-                elif key == 'front':
-                    pygame.draw.polygon(screen, self.thrusterColor, [to_pygame(self.body.position + point) for point in self.frontThrusterShape])
-                elif key == 'rear':
-                    pygame.draw.polygon(screen, self.thrusterColor, [to_pygame(self.body.position + point) for point in self.rearThrusterShape])
-                self.thrusterBools[key] = False
+        for bit, thrusterShape in enumerate([self.leftThrusterShape, self.rearThrusterShape, self.rightThrusterShape, self.frontThrusterShape]): ## In self.thrusters order
+            if self.thrusterBits & (1 << bit):
+                pygame.draw.polygon(screen, self.thrusterColor, [to_pygame(self.body.position + point) for point in thrusterShape])
+        self.thrusterBits = 0
     
     def checkLanding(self, platform):
+        ### Gate: skip the contact queries while the circle of radius reach around the lander misses the platform's bounding box
+        x, y = self.body.position
+        if y - self.reach > platform.bb.top or y + self.reach < platform.bb.bottom or x + self.reach < platform.bb.left or x - self.reach > platform.bb.right:
+            return None
+
         ### Check safe
         leftLegContactPointSet = self.leftLeg.shapes_collide(platform.shape)
         rightLegContactPointSet = self.rightLeg.shapes_collide(platform.shape)
         safeLandingVelMag = 48
 
         if len(leftLegContactPointSet.points) and len(rightLegContactPointSet.points):
-            if self.velArray[-1].get_length() > safeLandingVelMag:
+            if self.velHistory.latestSpeed() > safeLandingVelMag:
                 return 'crashed'
             else:
                 return 'safe'
         elif len(leftLegContactPointSet.points) or len(rightLegContactPointSet.points):
-            if self.velArray[-1].get_length() > safeLandingVelMag:
+            if self.velHistory.latestSpeed() > safeLandingVelMag:
                 return 'crashed'
         
         moduleContactPointSet = self.module.shapes_collide(platform.shape)
@@ -205,15 +283,18 @@ class Lander():
 
 
 class LunarLanderEnvironment():
-    def __init__(self, gravity=-140.0, displayWidth=DISPLAY_WIDTH, displayHeight=DISPLAY_HEIGHT, fps=FPS):
+    def __init__(self, gravity=-140.0, displayWidth=DISPLAY_WIDTH, displayHeight=DISPLAY_HEIGHT, fps=FPS, velHistoryWindow=4, seed=None, actionRepeat=1):
         self.screen = None
         self.displayWidth, self.displayHeight = displayWidth, displayHeight
         self.draw_options = None
         self.clock = None
         self.fps = fps
+        self.fonts = {} ## size: pygame Font
 
         self.gravity = gravity
+        self.actionRepeat = actionRepeat ## Physics substeps per step() call, each agent decision covers actionRepeat * 0.02s
         self.space = None
+        self.rng = random.Random(seed) ## Own generator for initial conditions, seed=None draws from OS entropy
 
         self.target = None
 
@@ -222,10 +303,16 @@ class LunarLanderEnvironment():
         self.platformRadius = 10
         self.platform = None
 
-        self.stateSpace = ['desiredAccX', 'desiredAccY', 'angle', 'angVel'] ## SETTING
-        self.stateSpaceSize = len(self.stateSpace)
+        self.velRewardThreshold = 50 ## When vel is velRewardThreshold or less, reward is +ve
+        self.angVelRewardThreshold = 0.5 ## If lander angular vel is angVelRewardThreshold or less then reward is +ve
+        self.desiredVelMaxMag = 44
+        self.desiredAccRewardThreshold = 40 ## If lander vel differs from desired vel by desiredAccRewardThreshold or less, then reward is +ve
+        self.angleScale = self.desiredAccRewardThreshold / self.angVelRewardThreshold ## Brings angles and angle rewards to the scale of desiredAcc
 
+        self.velHistoryWindow = velHistoryWindow ## Velocities kept per lander, 'velHistory' in stateSpace adds 2 * window inputs
+        self.stateSpace = ['desiredAccX', 'desiredAccY', 'angle', 'angVel'] ## SETTING
         self.rewardSpace = ['desiredAccReward', 'angVelReward'] ## SETTING
+        self.compileSpaces() ## Call again after changing stateSpace or rewardSpace
 
         self.actionSpace = [[],
                             ['left'],
@@ -236,68 +323,110 @@ class LunarLanderEnvironment():
                             # ['left', 'right'],
                             # ['left', 'rear', 'right']
         ] ## SETTING
-        self.actionSpaceSize = len(self.actionSpace)
+        self.actionSpaceSize = len(self.actionSpace) ## Call compileActions after changing actionSpace
 
         self.reset()
 
     def displayMessage(self, msg, size, color, centerPosition):
-        font = pygame.font.SysFont('comicsansms', size)
+        if size not in self.fonts: ## SysFont searches the system font list, so look each size up once
+            self.fonts[size] = pygame.font.SysFont('comicsansms', size)
+        font = self.fonts[size]
         textSurface = font.render(msg, True, color)
         textRect = textSurface.get_rect()
         textRect.center = centerPosition
         self.screen.blit(textSurface, textRect)
 
-    def applyAction(self, action):
-        self.lander.applyDefaultThrust(self.actionSpace[action])
+    def seed(self, seed):
+        self.rng.seed(seed)
 
-    def getStateReward(self):
-        posGlobal = self.lander.body.position
-        dispFromTarget = self.lander.body.position - self.target
+    def compileActions(self):
+        self.actionSpaceSize = len(self.actionSpace)
+        self.lander.compileActions(self.actionSpace)
 
-        vel = self.lander.body.velocity
-        velRewardThreshold = 50
-        velReward = -vel.get_length() + velRewardThreshold ## When velX is velXRewardThreshold or less, reward is +ve
-        
-        angle = (self.lander.body.angle + math.pi) % (math.pi * 2) - math.pi
-        angVel = self.lander.body.angular_velocity
-        angVelRewardThreshold = 0.5
-        angVelReward = -abs(self.lander.body.angular_velocity) + angVelRewardThreshold # If lander angular vel is 0.4 or less then reward is +e
-
-        desiredVelMaxMag = 44
-        desiredVel = constrainVec2d(self.target - self.lander.body.position, -desiredVelMaxMag, desiredVelMaxMag)
-        desiredAcc = desiredVel - self.lander.body.velocity
-        desiredAccRewardThreshold = 40
-        desiredAccReward = -desiredAcc.get_length() + desiredAccRewardThreshold ## If lander vel differs from desired vel by desiredAccRewardThreshold or less, then reward is +ve
-
-        state = []
+    def applyAction(self, action):
+        self.lander.applyAction(action)
+
+    def compileSpaces(self):
+        ## Resolve stateSpace and rewardSpace once into the intermediate quantities they need and a list of extractors,
+        ## so each step computes only the configured features and writes them straight into a float32 state array
+        quantities = {'desiredVel': ([], self.computeDesiredVel),
+                      'desiredAcc': (['desiredVel'], self.computeDesiredAcc)
+                      } ## name: (dependencies, method), in dependency order
+        stateFeatures = {'desiredAccX': (['desiredAcc'], 1, lambda: self.desiredAcc.x),
+                         'desiredAccY': (['desiredAcc'], 1, lambda: self.desiredAcc.y),
+                         'desiredVelX': (['desiredVel'], 1, lambda: self.desiredVel.x),
+                         'desiredVelY': (['desiredVel'], 1, lambda: self.desiredVel.y),
+                         'velX': ([], 1, lambda: self.lander.body.velocity.x),
+                         'velY': ([], 1, lambda: self.lander.body.velocity.y),
+                         'angle': ([], 1, lambda: ((self.lander.body.angle + math.pi) % (math.pi * 2) - math.pi) * self.angleScale),
+                         'angVel': ([], 1, lambda: self.lander.body.angular_velocity * self.angleScale),
+                         'velHistory': ([], 2 * self.velHistoryWindow, lambda: self.lander.velHistory.ordered().ravel())
+                         } ## name: (quantities needed, width, extractor)
+        rewardFeatures = {'desiredAccReward': (['desiredAcc'], lambda: -self.desiredAcc.get_length() + self.desiredAccRewardThreshold),
+                          'angVelReward': ([], lambda: (-abs(self.lander.body.angular_velocity) + self.angVelRewardThreshold) * self.angleScale),
+                          'velReward': ([], lambda: -self.lander.body.velocity.get_length() + self.velRewardThreshold)
+                          } ## name: (quantities needed, extractor)
+
+        needed = set()
+        def require(names):
+            for name in names:
+                require(quantities[name][0])
+                needed.add(name)
+
+        self.stateExtractors = [] ## (start, width, extractor)
+        start = 0
         for variable in self.stateSpace:
-            if variable == "desiredAccY":
-                state.append(desiredAcc.y)
-            elif variable == "desiredVelY":
-                state.append(desiredVel.y)
-            elif variable == "velY":
-                state.append(velY)
-
-            elif variable == "desiredAccX":
-                state.append(desiredAcc.x)
-            elif variable == "desiredVelX":
-                state.append(desiredVel.x)
-            elif variable == "velX":
-                state.append(velX)
-
-            elif variable == "angle":
-                state.append(angle * desiredAccRewardThreshold / angVelRewardThreshold)
-            elif variable == "angVel":
-                state.append(angVel * desiredAccRewardThreshold / angVelRewardThreshold)
-        
-        reward = 0
+            if variable not in stateFeatures:
+                raise ValueError(f"Unknown state variable '{variable}', expected one of {list(stateFeatures)}")
+            dependencies, width, extractor = stateFeatures[variable]
+            require(dependencies)
+            self.stateExtractors.append((start, width, extractor))
+            start += width
+        self.stateSpaceSize = start
+
+        self.rewardExtractors = []
         for variable in self.rewardSpace:
-            if variable == "desiredAccReward":
-                reward += desiredAccReward
-            elif variable == "angVelReward":
-                reward += angVelReward * desiredAccRewardThreshold / angVelRewardThreshold
-        
-        return state, reward
+            if variable not in rewardFeatures:
+                raise ValueError(f"Unknown reward variable '{variable}', expected one of {list(rewardFeatures)}")
+            dependencies, extractor = rewardFeatures[variable]
+            require(dependencies)
+            self.rewardExtractors.append(extractor)
+
+        self.quantityUpdates = [method for name, (dependencies, method) in quantities.items() if name in needed]
+        self.state = np.zeros(self.stateSpaceSize, dtype=np.float32)
+
+    def computeDesiredVel(self):
+        self.desiredVel = constrainVec2d(self.target - self.lander.body.position, -self.desiredVelMaxMag, self.desiredVelMaxMag)
+
+    def computeDesiredAcc(self):
+        self.desiredAcc = self.desiredVel - self.lander.body.velocity
+
+    def getStateReward(self, out=None): ## Writes the state into out if given, otherwise returns a new array
+        for update in self.quantityUpdates:
+            update()
+
+        state = self.state if out is None else out
+        for start, width, extractor in self.stateExtractors:
+            if width == 1:
+                state[start] = extractor()
+            else:
+                state[start:start + width] = extractor()
+
+        reward = 0
+        for extractor in self.rewardExtractors:
+            reward += extractor()
+
+        return (state.copy() if out is None else state), reward
+
+    def getReward(self): ## Reward alone, for action-repeat substeps whose state is never returned
+        for update in self.quantityUpdates:
+            update()
+
+        reward = 0
+        for extractor in self.rewardExtractors:
+            reward += extractor()
+
+        return reward
         
     def getTermination(self, step, numSteps):
         done = False
@@ -319,66 +448,99 @@ class LunarLanderEnvironment():
 
         return done, abortStatus
 
-    def step(self, action, step, maxSteps):
+    def step(self, action, step, maxSteps, out=None): ## out is an optional float32 array to write nextState into
         running = True
         info = dict()
 
-        self.applyAction(action)
-
-        self.space.step(0.02)
-        self.lander.velArray.append(self.lander.body.velocity)
-
-        nextState, reward = self.getStateReward()
-        done, abortStatus = self.getTermination(step, maxSteps)
+        ## The action is held for actionRepeat physics substeps. Reward is summed and termination checked after each
+        ## one, the state is only extracted once, after the last substep that ran.
+        reward = 0
+        for substep in range(self.actionRepeat):
+            self.applyAction(action)
+
+            self.stepPhysics()
+            self.lander.velHistory.append(self.lander.body.velocity)
+
+            done, abortStatus = self.getTermination(step, maxSteps)
+            if done or substep == self.actionRepeat - 1:
+                nextState, substepReward = self.getStateReward(out)
+                reward += substepReward
+                break
+            reward += self.getReward()
         info['abortStatus'] = abortStatus
 
         return nextState, reward, done, info
     
-    def reset(self, test=False):
+    def stepPhysics(self):
+        self.space.step(0.02)
+
+    def buildSpace(self, initPosition, test):
         self.space = pymunk.Space()
-        self.space.gravity = (0.0, self.gravity)        
+        self.space.gravity = (0.0, self.gravity)
+        self.lander = Lander(self.space, initPosition, self.velHistoryWindow)
+        self.lander.compileActions(self.actionSpace)
+        if test:
+            self.platform = Platform(self.space, Vec2d(0+self.platformRadius, self.platformRadius), Vec2d(self.displayWidth-self.platformRadius, self.platformRadius), self.platformRadius)
+        else:
+            self.platform = None
+
+    def reset(self, test=False, out=None, initialCondition=None): ## initialCondition is a start position, e.g. a row of initialConditionBank()
+        if initialCondition is None:
+            initialCondition = sampleInitialPosition(self.rng, self.displayWidth, self.displayHeight)
+        initPosition = Vec2d(float(initialCondition[0]), float(initialCondition[1]))
+
+        ## Training episodes have no platform and never touch anything, so the space and lander are kept and the body is
+        ## repositioned in place. Test episodes get a fresh space: contact leaves chipmunk state pymunk cannot reset (the
+        ## body's position-correction velocity, the spatial index history), and test episodes must stay reproducible.
+        if test or self.space is None or self.platform is not None:
+            self.buildSpace(initPosition, test)
+        else:
+            self.lander.reset(initPosition)
+            self.space.reindex_shapes_for_body(self.lander.body)
 
         if test: ##### SETTING #####
-            initPosition = Vec2d(random.uniform(self.displayWidth*0.2, self.displayWidth*0.8), random.uniform(self.displayHeight*0.2, self.displayHeight*0.8))
-            self.lander = Lander(self.space, initPosition)
             # self.lander.body.velocity = Vec2d(8, 10)
             # self.lander.body.angular_velocity = -2.9
-            
-            self.platform = Platform(self.space, Vec2d(0+self.platformRadius, self.platformRadius), Vec2d(self.displayWidth-self.platformRadius, self.platformRadius), self.platformRadius)
             self.target = Vec2d(self.displayWidth/2, self.platformRadius) ## 20 is y dist between lander position and lander legs)
         else:
-            initPosition = Vec2d(random.uniform(self.displayWidth*0.2, self.displayWidth*0.8), random.uniform(self.displayHeight*0.2, self.displayHeight*0.8))
-            self.lander = Lander(self.space, initPosition)
-            # self.lander.body.velocity = Vec2d(random.uniform(-50, 50), random.uniform(-50, 50))
-            # self.lander.body.angular_velocity = random.uniform(-3.14, 3.14)
-
-            self.platform = None
-        
+            # self.lander.body.velocity = Vec2d(self.rng.uniform(-50, 50), self.rng.uniform(-50, 50))
+            # self.lander.body.angular_velocity = self.rng.uniform(-3.14, 3.14)
             self.target = Vec2d(self.displayWidth/2, self.displayHeight/2 - 200) ## 20 is y dist between lander position and lander legs)
 
-        state, reward = self.getStateReward()
+        state, reward = self.getStateReward(out)
         return state
 
     #==================== Renderer ====================
-    def renderInit(self):
-        pygame.init()
-        self.screen = pygame.display.set_mode((self.displayWidth, self.displayHeight))
+    def renderInit(self, offscreen=False): ## offscreen draws into a plain Surface: no window, no display needed, no clock
+        global pygame
+        import pygame
+        import pymunk.pygame_util
+        if offscreen:
+            pygame.font.init()
+            self.screen = pygame.Surface((self.displayWidth, self.displayHeight))
+        else:
+            pygame.init()
+            self.screen = pygame.display.set_mode((self.displayWidth, self.displayHeight))
+            pygame.display.set_caption("Lunar lander")
+            self.clock = pygame.time.Clock()
         self.draw_options = pymunk.pygame_util.DrawOptions(self.screen)
-        pygame.display.set_caption("Lunar lander")
-        self.clock = pygame.time.Clock()
 
-    def render(self, report):
-        for event in pygame.event.get():
-            pass
+    def drawFrame(self, report): ## Draw the current state onto self.screen
         self.screen.fill(COLORS['SPACE_GRAY'])
-        self.displayMessage(report, 30, COLORS['WHITE'], Vector2(self.displayWidth/2, self.displayHeight * 0.15))
+        self.displayMessage(report, 30, COLORS['WHITE'], (self.displayWidth/2, self.displayHeight * 0.15))
         self.space.debug_draw(self.draw_options)
         self.lander.displayThrusterForces(self.screen)
         pygame.draw.circle(self.screen, COLORS['PINK'], to_pygame(self.target), 4)
         # self.lander.display(self.screen)
 
+    def render(self, report):
+        for event in pygame.event.get():
+            pass
+        self.drawFrame(report)
+
         pygame.display.update()
         self.clock.tick(self.fps)
 
     def closeRender(self):
+        self.fonts = {}
         pygame.quit()
\ No newline at end of file
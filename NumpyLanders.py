@@ -0,0 +1,229 @@
+import math
+import random
+import numpy as np
+
+from LunarLanderEnvironment import sampleInitialPosition
+
+#===========================================================================================
+### Classes
+#===========================================================================================
+class NumpyLanders():
+    ## Steps a batch of numLanders landers as NumPy arrays instead of one pymunk space each. Everything physical is read
+    ## from env, a LunarLanderEnvironment used as a template: the body's mass, moment and centre of gravity, gravity,
+    ## and the velocity and spin each action's compiled impulses give the lander. Integration follows chipmunk's
+    ## order (positions from current velocities, then gravity into velocities), so free flight matches pymunk to
+    ## rounding. Ground contact is approximate: each shape touches the platform's flat top at its lowest vertex, and
+    ## the contacts get chipmunk-style sequential impulses (inelastic, Coulomb friction) but no penetration correction.
+    def __init__(self, numLanders, env, test=False, seed=None):
+        self.numLanders = numLanders
+        self.test = test
+        self.dt = 0.02
+        self.gravity = env.gravity
+        self.actionRepeat = env.actionRepeat
+        self.displayWidth, self.displayHeight = env.displayWidth, env.displayHeight
+        self.velRewardThreshold = env.velRewardThreshold
+        self.angVelRewardThreshold = env.angVelRewardThreshold
+        self.desiredVelMaxMag = env.desiredVelMaxMag
+        self.desiredAccRewardThreshold = env.desiredAccRewardThreshold
+        self.angleScale = env.angleScale
+        self.safeLandingVelMag = 48
+        self.rngs = [random.Random(None if seed is None else seed + i) for i in range(numLanders)] ## Same initial conditions as VecLunarLander's env i
+        for rng in self.rngs:
+            sampleInitialPosition(rng, self.displayWidth, self.displayHeight) ## Discarded, as the reset in LunarLanderEnvironment.__init__ does
+
+        if env.platform is None:
+            env.reset(test=True) ## Build the platform so its geometry and friction can be read
+        lander = env.lander
+        body = lander.body
+        self.mass = body.mass
+        self.moment = body.moment
+        self.cog = np.array(body.center_of_gravity, dtype=np.float64) ## In body coordinates
+        ## Velocity and angular velocity each action adds, in body coordinates, one row per action of the lander's compiled
+        ## action table. Impulses do not depend on the state, so rotating these by the current angle is the whole thrust model.
+        self.actionDeltaV = lander.actionNetImpulses / self.mass
+        self.actionDeltaW = lander.actionAngularImpulses / self.moment
+
+        platformFriction = env.platform.shape.friction
+        self.contactShapes = [(np.array(list(vertices), dtype=np.float64) - self.cog, shape.friction * platformFriction)
+                              for vertices, shape in [(lander.leftLegShape, lander.leftLeg), (lander.rightLegShape, lander.rightLeg), (lander.moduleShape, lander.module)]
+                              ] ## (vertices relative to the centre of gravity, friction with the platform), chipmunk multiplies frictions
+        self.platformTop = env.platform.bb.top
+        self.contactIterations = env.space.iterations
+        if test:
+            self.target = np.array([self.displayWidth/2, env.platformRadius])
+        else:
+            self.target = np.array([self.displayWidth/2, self.displayHeight/2 - 200])
+
+        n = numLanders
+        self.position = np.zeros((n, 2)) ## Centre of gravity, world coordinates
+        self.velocity = np.zeros((n, 2))
+        self.angle = np.zeros(n)
+        self.angularVelocity = np.zeros(n)
+        self.velHistory = np.zeros((n, env.velHistoryWindow, 2)) ## Oldest to newest, zeros while an episode is younger than the window
+
+        self.compileSpaces(env.stateSpace, env.rewardSpace)
+
+    def compileSpaces(self, stateSpace, rewardSpace):
+        ## Same names and meaning as LunarLanderEnvironment.compileSpaces, each feature computed for the whole batch
+        stateFeatures = {'desiredAccX': (1, lambda q: q['desiredAcc'][:, 0]),
+                         'desiredAccY': (1, lambda q: q['desiredAcc'][:, 1]),
+                         'desiredVelX': (1, lambda q: q['desiredVel'][:, 0]),
+                         'desiredVelY': (1, lambda q: q['desiredVel'][:, 1]),
+                         'velX': (1, lambda q: self.velocity[:, 0]),
+                         'velY': (1, lambda q: self.velocity[:, 1]),
+                         'angle': (1, lambda q: (np.mod(self.angle + math.pi, math.pi * 2) - math.pi) * self.angleScale),
+                         'angVel': (1, lambda q: self.angularVelocity * self.angleScale),
+                         'velHistory': (2 * self.velHistory.shape[1], lambda q: self.velHistory.reshape(self.numLanders, -1))
+                         } ## name: (width, extractor)
+        rewardFeatures = {'desiredAccReward': lambda q: -np.hypot(q['desiredAcc'][:, 0], q['desiredAcc'][:, 1]) + self.desiredAccRewardThreshold,
+                          'angVelReward': lambda q: (-np.abs(self.angularVelocity) + self.angVelRewardThreshold) * self.angleScale,
+                          'velReward': lambda q: -np.hypot(self.velocity[:, 0], self.velocity[:, 1]) + self.velRewardThreshold
+                          }
+        self.stateExtractors = []
+        start = 0
+        for variable in stateSpace:
+            if variable not in stateFeatures:
+                raise ValueError(f"Unknown state variable '{variable}', expected one of {list(stateFeatures)}")
+            width, extractor = stateFeatures[variable]
+            self.stateExtractors.append((start, width, extractor))
+            start += width
+        self.stateSpaceSize = start
+        self.rewardExtractors = []
+        for variable in rewardSpace:
+            if variable not in rewardFeatures:
+                raise ValueError(f"Unknown reward variable '{variable}', expected one of {list(rewardFeatures)}")
+            self.rewardExtractors.append(rewardFeatures[variable])
+
+    def bodyPositions(self): ## Body origins (pymunk's body.position) from the centres of gravity
+        cos, sin = np.cos(self.angle), np.sin(self.angle)
+        return np.stack([self.position[:, 0] - (cos * self.cog[0] - sin * self.cog[1]),
+                         self.position[:, 1] - (sin * self.cog[0] + cos * self.cog[1])], axis=1)
+
+    def quantities(self):
+        desiredVel = self.target - self.bodyPositions()
+        magnitude = np.hypot(desiredVel[:, 0], desiredVel[:, 1])
+        scale = np.where(magnitude > self.desiredVelMaxMag, self.desiredVelMaxMag / np.maximum(magnitude, 1e-300), 1.0)
+        desiredVel *= scale[:, None]
+        return {'desiredVel': desiredVel, 'desiredAcc': desiredVel - self.velocity}
+
+    def getStates(self, out):
+        q = self.quantities()
+        for start, width, extractor in self.stateExtractors:
+            if width == 1:
+                out[:, start] = extractor(q)
+            else:
+                out[:, start:start + width] = extractor(q)
+        return out, self.getRewards(q)
+
+    def getRewards(self, q=None):
+        q = self.quantities() if q is None else q
+        rewards = np.zeros(self.numLanders)
+        for extractor in self.rewardExtractors:
+            rewards += extractor(q)
+        return rewards
+
+    def solveContacts(self, live): ## Returns (leftLeg, rightLeg, module) touching masks over all landers
+        cos, sin = np.cos(self.angle)[:, None], np.sin(self.angle)[:, None]
+        rows = np.arange(self.numLanders)
+        contacts = []
+        for vertices, friction in self.contactShapes:
+            rx = cos * vertices[:, 0] - sin * vertices[:, 1] ## (numLanders, numVertices) offsets from the centre of gravity
+            ry = sin * vertices[:, 0] + cos * vertices[:, 1]
+            lowest = ry.argmin(axis=1)
+            touching = self.position[:, 1] + ry[rows, lowest] <= self.platformTop
+            touching[~live] = False
+            contacts.append((touching, rx[rows, lowest], ry[rows, lowest], friction))
+        touchingAny = contacts[0][0] | contacts[1][0] | contacts[2][0]
+        if not touchingAny.any():
+            return [touching for touching, _, _, _ in contacts]
+
+        ## Sequential impulses on the landers in contact: normal impulses keep contact points from approaching the
+        ## surface (never pulling), friction impulses are bounded by friction times the accumulated normal impulse
+        i = np.flatnonzero(touchingAny)
+        vx, vy, w = self.velocity[i, 0], self.velocity[i, 1], self.angularVelocity[i]
+        accumulated = [(np.zeros(len(i)), np.zeros(len(i))) for contact in contacts]
+        for iteration in range(self.contactIterations):
+            for (touching, rx, ry, friction), (normalAcc, tangentAcc) in zip(contacts, accumulated):
+                t, rx, ry = touching[i], rx[i], ry[i]
+                normalVel = vy + w * rx
+                impulse = np.where(t, -normalVel / (1 / self.mass + rx * rx / self.moment), 0)
+                newAcc = np.maximum(normalAcc + impulse, 0)
+                impulse = newAcc - normalAcc
+                normalAcc[:] = newAcc
+                vy = vy + impulse / self.mass
+                w = w + rx * impulse / self.moment
+
+                tangentVel = vx - w * ry
+                impulse = np.where(t, -tangentVel / (1 / self.mass + ry * ry / self.moment), 0)
+                limit = friction * normalAcc
+                newAcc = np.clip(tangentAcc + impulse, -limit, limit)
+                impulse = newAcc - tangentAcc
+                tangentAcc[:] = newAcc
+                vx = vx + impulse / self.mass
+                w = w - ry * impulse / self.moment
+        self.velocity[i, 0], self.velocity[i, 1], self.angularVelocity[i] = vx, vy, w
+        return [touching for touching, _, _, _ in contacts]
+
+    def getTermination(self, steps, maxSteps, contacts):
+        abortStatuses = np.full(self.numLanders, None, dtype=object)
+        if contacts is not None:
+            leftLeg, rightLeg, module = contacts
+            fast = np.hypot(self.velHistory[:, -1, 0], self.velHistory[:, -1, 1]) > self.safeLandingVelMag
+            bothLegs = leftLeg & rightLeg
+            abortStatuses[bothLegs & ~fast] = 'safe'
+            abortStatuses[(leftLeg | rightLeg) & fast] = 'crashed'
+            abortStatuses[module & (abortStatuses == None)] = 'crashed'
+        bodyPositions = self.bodyPositions()
+        outOfBounds = (bodyPositions[:, 0] < 0) | (bodyPositions[:, 0] > self.displayWidth) | (bodyPositions[:, 1] < 0) | (bodyPositions[:, 1] > self.displayHeight)
+        abortStatuses[outOfBounds & (abortStatuses == None)] = 'out_of_bounds'
+        abortStatuses[(steps >= maxSteps) & (abortStatuses == None)] = 'time_out'
+        return abortStatuses != None, abortStatuses
+
+    def step(self, actions, steps, maxSteps, out): ## Writes next states into out, returns rewards, dones, abortStatuses
+        actions = np.asarray(actions)
+        deltaV = self.actionDeltaV[actions]
+        deltaW = self.actionDeltaW[actions]
+        rewards = np.zeros(self.numLanders)
+        abortStatuses = np.full(self.numLanders, None, dtype=object)
+        running = np.ones(self.numLanders, dtype=np.bool_)
+        for substep in range(self.actionRepeat):
+            ## Landers that finished in an earlier substep stay where they stopped
+            live = slice(None) if running.all() else running
+
+            ## Thruster impulses, rotated from body to world coordinates
+            cos, sin = np.cos(self.angle[live]), np.sin(self.angle[live])
+            self.velocity[live, 0] += cos * deltaV[live, 0] - sin * deltaV[live, 1]
+            self.velocity[live, 1] += sin * deltaV[live, 0] + cos * deltaV[live, 1]
+            self.angularVelocity[live] += deltaW[live]
+
+            ## chipmunk's step: positions from the current velocities, then gravity into the velocities
+            self.position[live] += self.velocity[live] * self.dt
+            self.angle[live] += self.angularVelocity[live] * self.dt
+            self.velocity[live, 1] += self.gravity * self.dt
+            contacts = self.solveContacts(running) if self.test else None
+            self.velHistory[live, :-1] = self.velHistory[live, 1:]
+            self.velHistory[live, -1] = self.velocity[live]
+
+            dones, substepStatuses = self.getTermination(steps, maxSteps, contacts)
+            dones &= running
+            abortStatuses[dones] = substepStatuses[dones]
+            if substep == self.actionRepeat - 1 or (running & ~dones).sum() == 0:
+                out, substepRewards = self.getStates(out) ## Stopped landers have not moved since, so this is their final state too
+                rewards[running] += substepRewards[running]
+                break
+            rewards[running] += self.getRewards()[running]
+            running &= ~dones
+        return rewards, abortStatuses != None, abortStatuses
+
+    def reset(self, indices, out): ## Restart the given landers from their own generators, writing their states into out
+        for i in indices:
+            self.position[i] = sampleInitialPosition(self.rngs[i], self.displayWidth, self.displayHeight)
+        self.position[indices] += self.cog ## Upright, so the centre of gravity sits at the body offset
+        self.velocity[indices] = 0
+        self.angle[indices] = 0
+        self.angularVelocity[indices] = 0
+        self.velHistory[indices] = 0
+        states = np.empty_like(out)
+        self.getStates(states)
+        out[indices] = states[indices]
+        return out
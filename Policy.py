@@ -0,0 +1,114 @@
+import json
+import random
+import numpy as np
+
+ACTIVATIONS = {'tanh': lambda x: np.tanh(x, out=x),
+               'relu': lambda x: np.maximum(x, 0, out=x),
+               'linear': lambda x: x
+               }
+
+#===========================================================================================
+### Helper functions
+#===========================================================================================
+## Read kernels, biases and activations of a Sequential Dense model saved by Keras, without TensorFlow when the file is HDF5
+def loadKerasWeights(modelPath):
+    import h5py
+    if h5py.is_hdf5(modelPath):
+        with h5py.File(modelPath, 'r') as f:
+            modelConfig = f.attrs['model_config']
+            modelConfig = json.loads(modelConfig.decode() if isinstance(modelConfig, bytes) else modelConfig)
+            layerConfigs = modelConfig['config']['layers'] if isinstance(modelConfig['config'], dict) else modelConfig['config']
+            activations = [layer['config']['activation'] for layer in layerConfigs if layer['class_name'] == 'Dense']
+
+            modelWeights = f['model_weights'] if 'model_weights' in f else f
+            weights = []
+            for layerName in modelWeights.attrs['layer_names']:
+                layerGroup = modelWeights[layerName.decode() if isinstance(layerName, bytes) else layerName]
+                for weightName in layerGroup.attrs['weight_names']:
+                    weights.append(np.array(layerGroup[weightName.decode() if isinstance(weightName, bytes) else weightName]))
+        return weights, activations
+
+    ## SavedModel directories (what newer tf.keras writes for a '.model' path) need TensorFlow to read
+    from tensorflow.keras import models
+    model = models.load_model(modelPath)
+    activations = [layer.get_config()['activation'] for layer in model.layers if 'activation' in layer.get_config()]
+    return model.get_weights(), activations
+
+## A dueling head is two linear layers on the last hidden layer, value (hidden, 1) then advantage (hidden, numOutputs),
+## combined as V + A - mean A. That is linear as well, so it folds exactly into one ordinary output layer.
+def isDuelingHead(kernels): ## In a Sequential MLP each kernel takes the previous one's outputs instead
+    return len(kernels) > 2 and kernels[-2].shape == (kernels[-1].shape[0], 1) and kernels[-1].shape[0] != 1
+
+def foldDuelingHead(kernels, biases, activations):
+    if not isDuelingHead(kernels):
+        return kernels, biases, activations
+    valueKernel, advantageKernel = kernels[-2], kernels[-1]
+    valueBias, advantageBias = biases[-2], biases[-1]
+    kernel = valueKernel + advantageKernel - advantageKernel.mean(axis=1, keepdims=True)
+    bias = valueBias + advantageBias - advantageBias.mean()
+    return kernels[:-2] + [kernel], biases[:-2] + [bias], activations[:-1] if activations else activations
+
+## Convert a saved Keras checkpoint into a compact .npz weights file that Policy.load reads
+def exportModel(modelPath, weightsPath=None):
+    weights, activations = loadKerasWeights(modelPath)
+    weightsPath = weightsPath or modelPath.rsplit('.', 1)[0] + '.npz'
+    arrays = {f'weight{i}': np.asarray(weight, dtype=np.float32) for i, weight in enumerate(weights)}
+    np.savez(weightsPath, activations=np.array(activations), **arrays)
+    return weightsPath
+
+#===========================================================================================
+### Classes
+#===========================================================================================
+class Policy():
+    ## NumPy-only forward pass of the DQN's Dense MLP, so processes that only need to act never import TensorFlow.
+    ## Single-state inference reuses preallocated layer buffers and does no allocation per call.
+    ## Dueling networks are folded into the same plain MLP when their weights are set.
+    def __init__(self, weights=None, activations=None):
+        self.kernels = []
+        self.biases = []
+        self.activations = []
+        self.buffers = []
+        if weights is not None:
+            self.setWeights(weights, activations)
+
+    @classmethod
+    def load(cls, path): ## path is an exported .npz or a Keras checkpoint
+        if path.endswith('.npz'):
+            with np.load(path) as data:
+                weights = [data[f'weight{i}'] for i in range(len(data.files) - 1)]
+                activations = [str(activation) for activation in data['activations']]
+        else:
+            weights, activations = loadKerasWeights(path)
+        return cls(weights, activations)
+
+    def setWeights(self, weights, activations=None): ## weights is [kernel, bias, kernel, bias, ...] as returned by model.get_weights()
+        kernels, biases, activations = foldDuelingHead([np.asarray(kernel, dtype=np.float64) for kernel in weights[0::2]],
+                                                       [np.asarray(bias, dtype=np.float64) for bias in weights[1::2]], activations)
+        self.kernels = [np.ascontiguousarray(kernel, dtype=np.float32) for kernel in kernels]
+        self.biases = [np.ascontiguousarray(bias, dtype=np.float32) for bias in biases]
+        self.activations = activations or ['tanh'] * (len(self.kernels) - 1) + ['linear']
+        self.input = np.zeros((1, self.kernels[0].shape[0]), dtype=np.float32)
+        self.buffers = [np.zeros((1, kernel.shape[1]), dtype=np.float32) for kernel in self.kernels]
+
+    @property
+    def numOutputs(self):
+        return len(self.biases[-1])
+
+    def forward(self, x, buffers):
+        for kernel, bias, activation, out in zip(self.kernels, self.biases, self.activations, buffers):
+            np.dot(x, kernel, out=out)
+            out += bias
+            ACTIVATIONS[activation](out)
+            x = out
+        return x
+
+    def predict(self, states): ## states is (batch, numInputs), returns (batch, numOutputs) Q-values
+        states = np.asarray(states, dtype=np.float32)
+        buffers = [np.empty((len(states), kernel.shape[1]), dtype=np.float32) for kernel in self.kernels]
+        return self.forward(states, buffers)
+
+    def selectAction(self, state, epsilon=0):
+        if np.random.random() <= epsilon:
+            return random.randrange(self.numOutputs)
+        self.input[0] = state
+        return int(np.argmax(self.forward(self.input, self.buffers)[0]))
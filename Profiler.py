@@ -0,0 +1,68 @@
+import json
+import time
+import numpy as np
+
+#===========================================================================================
+### Classes
+#===========================================================================================
+class Profiler():
+    ## Opt-in timing of hot-path methods. wrap() swaps an object's methods for timed versions on that instance only,
+    ## so nothing is measured (and nothing costs anything) unless a profiler is attached. Each call appends one
+    ## duration to its phase's list; report() folds the lists into run totals, prints a table with percentiles and
+    ## appends the same summary as one JSON line to jsonPath. Nested phases (env.step contains env.stepPhysics)
+    ## are each timed in full, so shares of wall time can add up to more than 100%.
+    def __init__(self, jsonPath=None):
+        self.jsonPath = jsonPath
+        self.samples = {} ## phase: [seconds] since the last report
+        self.totals = {} ## phase: [calls, seconds] over the whole run
+        self.windowStart = time.perf_counter()
+        self.runStart = self.windowStart
+
+    def wrap(self, obj, methodNames, prefix):
+        for name in methodNames:
+            method = getattr(obj, name)
+            samples = self.samples.setdefault(prefix + name, []) ## Shared by every object wrapped under the same prefix
+            def timed(*args, _method=method, _samples=samples, **kwargs):
+                start = time.perf_counter()
+                result = _method(*args, **kwargs)
+                _samples.append(time.perf_counter() - start)
+                return result
+            setattr(obj, name, timed)
+
+    def record(self, phase, seconds): ## For phases that are not a single method call
+        self.samples.setdefault(phase, []).append(seconds)
+
+    def summary(self):
+        now = time.perf_counter()
+        wall = now - self.windowStart
+        phases = {}
+        for phase, samples in self.samples.items():
+            total = self.totals.setdefault(phase, [0, 0.0])
+            if samples:
+                durations = np.array(samples)
+                p50, p90, p99 = np.percentile(durations, [50, 90, 99])
+                total[0] += len(durations)
+                total[1] += float(durations.sum())
+                phases[phase] = {'calls': len(durations),
+                                 'seconds': float(durations.sum()),
+                                 'share': float(durations.sum() / wall),
+                                 'mean': float(durations.mean()),
+                                 'p50': float(p50), 'p90': float(p90), 'p99': float(p99),
+                                 'max': float(durations.max()),
+                                 'runCalls': total[0], 'runSeconds': total[1]
+                                 }
+                samples.clear() ## Cleared in place, the wrappers hold on to these lists
+        self.windowStart = now
+        return {'wall': wall, 'runWall': now - self.runStart, 'phases': phases}
+
+    def report(self, label=None): ## Prints and returns the summary of everything timed since the last report
+        summary = self.summary()
+        summary['label'] = label
+        print(f"\n{label or 'Profile'}: {summary['wall']:.3f} s wall")
+        print(f"{'phase': <24} {'calls': >7} {'total ms': >10} {'share': >7} {'mean µs': >9} {'p50 µs': >9} {'p90 µs': >9} {'p99 µs': >9} {'max µs': >10}")
+        for phase, stats in sorted(summary['phases'].items(), key=lambda item: item[1]['seconds'], reverse=True):
+            print(f"{phase: <24} {stats['calls']: >7} {stats['seconds'] * 1e3: >10.1f} {stats['share']: >7.1%} {stats['mean'] * 1e6: >9.1f} {stats['p50'] * 1e6: >9.1f} {stats['p90'] * 1e6: >9.1f} {stats['p99'] * 1e6: >9.1f} {stats['max'] * 1e6: >10.1f}")
+        if self.jsonPath:
+            with open(self.jsonPath, 'a') as f:
+                f.write(json.dumps(summary) + '\n')
+        return summary
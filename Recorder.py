@@ -0,0 +1,77 @@
+import os
+import zlib
+import struct
+import numpy as np
+
+from LunarLanderEnvironment import FPS
+
+VIDEO_EXTENSIONS = ('.mp4', '.avi', '.mov', '.mkv', '.gif')
+PNG_COMPRESSION = 1 ## zlib level, frames are mostly flat background so fast compression loses little
+
+#===========================================================================================
+### Helper functions
+#===========================================================================================
+def pngChunk(kind, data):
+    return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data) & 0xffffffff)
+
+## Write an (height, width, 3) uint8 RGB frame as a PNG. pygame.image.save always compresses at libpng's default level,
+## which costs several times more than drawing the frame.
+def writePng(path, frame):
+    height, width, _ = frame.shape
+    rows = np.zeros((height, width * 3 + 1), dtype=np.uint8) ## Leading 0 per row: PNG filter type None
+    rows[:, 1:] = frame.reshape(height, -1)
+    with open(path, 'wb') as f:
+        f.write(b'\x89PNG\r\n\x1a\n')
+        f.write(pngChunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)))
+        f.write(pngChunk(b'IDAT', zlib.compress(rows.tobytes(), PNG_COMPRESSION)))
+        f.write(pngChunk(b'IEND', b''))
+
+#===========================================================================================
+### Classes
+#===========================================================================================
+class EpisodeRecorder():
+    ## Renders an environment offscreen (no window, no clock tick) and writes its frames in batches of batchSize.
+    ## A path ending in a video extension is encoded with imageio (optional, needs imageio and imageio-ffmpeg),
+    ## any other path is a directory of numbered PNGs, which only needs pygame.
+    def __init__(self, env, path, fps=FPS, batchSize=64):
+        env.renderInit(offscreen=True)
+        self.env = env
+        self.path = path
+        self.pitchPixels = env.screen.get_pitch() // 4
+        self.frames = np.empty((batchSize, env.displayHeight, self.pitchPixels, 4), dtype=np.uint8) ## Raw 32 bit surface rows
+        self.rgb = [shift // 8 for shift in env.screen.get_shifts()[:3]] ## Byte of each colour within a little-endian pixel
+        self.count = 0 ## Frames waiting in self.frames
+        self.written = 0
+        self.writer = None
+        if path.lower().endswith(VIDEO_EXTENSIONS):
+            try:
+                import imageio
+            except ImportError:
+                raise ImportError(f"Recording to {path} needs imageio (pip install imageio imageio-ffmpeg), or give a directory to write PNG frames")
+            self.writer = imageio.get_writer(path, fps=fps)
+        else:
+            os.makedirs(path, exist_ok=True)
+
+    def capture(self, report=""):
+        self.env.drawFrame(report)
+        self.frames[self.count] = np.frombuffer(self.env.screen.get_buffer(), dtype=np.uint8).reshape(self.frames.shape[1:]) ## Plain memory copy, no per-pixel conversion
+        self.count += 1
+        if self.count == len(self.frames):
+            self.flush()
+
+    def flush(self):
+        frames = self.frames[:self.count, :, :self.env.displayWidth, self.rgb] ## One channel reorder for the whole batch
+        for frame in frames:
+            if self.writer:
+                self.writer.append_data(frame)
+            else:
+                writePng(os.path.join(self.path, f"frame{self.written:05d}.png"), frame)
+            self.written += 1
+        self.count = 0
+
+    def close(self): ## Returns the number of frames written
+        self.flush()
+        if self.writer:
+            self.writer.close()
+        self.env.closeRender()
+        return self.written
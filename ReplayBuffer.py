@@ -0,0 +1,291 @@
+import os
+import json
+import numpy as np
+
+META_NAME = 'meta.json'
+
+#===========================================================================================
+### Helper functions
+#===========================================================================================
+## Memory-mapped .npy file, reopened in place (no read, no copy) if it already exists
+def openArray(path, shape, dtype):
+    if os.path.exists(path):
+        array = np.load(path, mmap_mode='r+')
+        if array.shape != shape or array.dtype != dtype:
+            raise ValueError(f"{path} holds {array.dtype} {array.shape}, expected {np.dtype(dtype)} {shape}")
+        return array
+    return np.lib.format.open_memmap(path, mode='w+', dtype=dtype, shape=shape)
+
+#===========================================================================================
+### Classes
+#===========================================================================================
+class ReplayBuffer():
+    ## Fixed-size circular replay memory backed by preallocated contiguous arrays.
+    ## Insertion is O(1) and overwrites the oldest transition once the buffer is full.
+    ## With a directory the arrays are memory-mapped .npy files in it: the buffer can outgrow RAM, flush() persists
+    ## it without copying, and a new buffer on the same directory carries on from the flushed contents.
+    ## Each transition also links to the next one from the same stream (one lander or actor), so n-step returns can be
+    ## gathered for a whole sample at once even though vectorised collection interleaves the streams.
+    persistedFields = ['index', 'size']
+
+    def __init__(self, capacity, stateSize, directory=None, linked=True): ## linked=False skips the stream links, for 1-step returns
+        self.capacity = capacity
+        self.stateSize = stateSize
+        self.directory = directory
+        self.linked = linked
+        self.mmaps = []
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.states = self.allocate('states', (capacity, stateSize), np.float32)
+        self.actions = self.allocate('actions', (capacity,), np.int64)
+        self.rewards = self.allocate('rewards', (capacity,), np.float32)
+        self.nextStates = self.allocate('nextStates', (capacity, stateSize), np.float32)
+        self.dones = self.allocate('dones', (capacity,), np.bool_)
+        unlinked = not directory or not os.path.exists(os.path.join(directory, 'nextIndices.npy')) ## Also buffers persisted before links existed
+        self.nextIndices = self.allocate('nextIndices', (capacity,), np.int64) ## Next transition of the same stream, -1 if none yet
+        if unlinked:
+            self.nextIndices.fill(-1)
+
+        self.index = 0 ## Next write position
+        self.size = 0
+        self.loadMeta()
+        if not unlinked:
+            self.dropStaleLinks()
+        self.added = self.index ## Write count, kept congruent to index so a count's slot is count % capacity
+        self.streamTails = np.full(0, -1, dtype=np.int64) ## Write count of each stream's latest transition, streams start afresh in a new object
+
+    def allocate(self, name, shape, dtype):
+        if not self.directory:
+            return np.zeros(shape, dtype=dtype)
+        mmap = openArray(os.path.join(self.directory, name + '.npy'), shape, dtype)
+        self.mmaps.append(mmap)
+        return mmap.view(np.ndarray) ## Same mapped memory, without np.memmap's per-operation overhead
+
+    def loadMeta(self): ## Restore the ring position saved by the last flush(), if there was one
+        path = os.path.join(self.directory, META_NAME) if self.directory else None
+        if path and os.path.exists(path):
+            with open(path) as f:
+                meta = json.load(f)
+            for name in self.persistedFields:
+                setattr(self, name, meta[name])
+
+    def dropStaleLinks(self):
+        ## flush() takes the ring position before syncing the arrays while the learner keeps adding, so a link written after
+        ## that snapshot can run from the newest flushed transition into a slot past the write position, which the next add
+        ## overwrites with an unrelated transition. Links only ever point to newer writes: drop any that point to an older one.
+        ages = (np.arange(self.capacity) - self.index) % self.capacity ## 0 for the oldest slot, capacity - 1 for the newest
+        linked = np.flatnonzero(self.nextIndices >= 0)
+        stale = linked[ages[self.nextIndices[linked]] <= ages[linked]]
+        self.nextIndices[stale] = -1
+
+    def flush(self): ## Write memory-mapped arrays and the ring position to disk, a no-op for in-memory buffers
+        if not self.directory:
+            return
+        meta = {name: getattr(self, name) for name in self.persistedFields} ## Taken first, so the arrays are at least this new
+        for mmap in self.mmaps:
+            mmap.flush()
+        path = os.path.join(self.directory, META_NAME)
+        with open(path + '.tmp', 'w') as f:
+            json.dump(meta, f)
+        os.replace(path + '.tmp', path)
+
+    def __len__(self):
+        return self.size
+
+    def add(self, state, action, reward, nextState, done, stream=0):
+        i = self.index
+        self.states[i] = state
+        self.actions[i] = action
+        self.rewards[i] = reward
+        self.nextStates[i] = nextState
+        self.dones[i] = done
+        if self.linked:
+            self.linkStream(i, stream)
+        else:
+            self.nextIndices[i] = -1 ## So a buffer reopened with links on finds no stale ones
+
+        self.index = (i + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+        return i
+
+    def addBatch(self, states, actions, rewards, nextStates, dones, streams=None):
+        ## streams gives each row's stream, in order within a stream. None means row j is stream j, as from VecLunarLander,
+        ## and a single int puts every row in that stream, as for a chunk from one actor.
+        indices = (self.index + np.arange(len(actions))) % self.capacity
+        self.states[indices] = states
+        self.actions[indices] = actions
+        self.rewards[indices] = rewards
+        self.nextStates[indices] = nextStates
+        self.dones[indices] = dones
+        if not self.linked:
+            self.nextIndices[indices] = -1
+        elif len(indices) == 1: ## As from the default single-lander loop
+            self.linkStream(indices[0], 0 if streams is None else np.ravel(streams)[0])
+        else:
+            self.linkStreams(indices, streams)
+
+        self.index = (self.index + len(actions)) % self.capacity
+        self.size = min(self.size + len(actions), self.capacity)
+        return indices
+
+    def linkStream(self, i, stream): ## linkStreams for a single transition, in scalar operations without the sort
+        count = self.added
+        self.added += 1
+        if stream >= len(self.streamTails):
+            self.streamTails = np.concatenate([self.streamTails, np.full(stream + 1 - len(self.streamTails), -1, dtype=np.int64)])
+        self.nextIndices[i] = -1
+        tail = self.streamTails[stream]
+        if tail >= 0 and tail >= self.added - self.capacity:
+            self.nextIndices[tail % self.capacity] = i
+        self.streamTails[stream] = count
+
+    def linkStreams(self, indices, streams): ## indices were just written, in insertion order, streams as for addBatch
+        ## The ring overwrites oldest first, so a live transition only ever links to a newer one, which is live too.
+        ## A stream's previous transition is linked only if this batch has not overwritten it.
+        counts = self.added + np.arange(len(indices))
+        self.added += len(indices)
+        self.nextIndices[indices] = -1
+        if streams is None: ## Row j is stream j, so each row starts and ends its stream's part of the batch
+            streams = np.arange(len(indices))
+            heads = lasts = slice(None)
+        else:
+            streams = np.broadcast_to(np.asarray(streams, dtype=np.int64), indices.shape)
+            if np.any(streams[1:] < streams[:-1]): ## Rows from one actor are in stream order already
+                order = np.argsort(streams, kind='stable')
+                streams, indices, counts = streams[order], indices[order], counts[order]
+            changes = streams[1:] != streams[:-1]
+            self.nextIndices[indices[:-1][~changes]] = indices[1:][~changes]
+            heads = np.concatenate(([True], changes)) ## First row of each stream in this batch
+            lasts = np.concatenate((changes, [True])) ## Last row of each stream in this batch
+        if streams[-1] >= len(self.streamTails): ## Sorted, so the last stream is the largest
+            self.streamTails = np.concatenate([self.streamTails, np.full(streams[-1] + 1 - len(self.streamTails), -1, dtype=np.int64)])
+        tails = self.streamTails[streams[heads]]
+        live = (tails >= 0) & (tails >= self.added - self.capacity)
+        self.nextIndices[tails[live] % self.capacity] = indices[heads][live]
+        self.streamTails[streams[lasts]] = counts[lasts]
+
+    def getNStepBatch(self, indices, nSteps, gamma):
+        ## Like getBatch, following each transition's stream for up to nSteps transitions, all samples at once. A return
+        ## stops early at the end of its episode or at its stream's newest transition. Returns states, actions, returns,
+        ## nextStates, dones, discounts, with the target returns + discounts * (1 - dones) * max Q(nextStates).
+        returns = self.rewards[indices].copy()
+        discounts = np.full(len(indices), gamma, dtype=np.float32)
+        lasts = np.asarray(indices)
+        extend = ~self.dones[lasts]
+        for k in range(1, nSteps):
+            nextIndices = self.nextIndices[lasts]
+            extend &= nextIndices >= 0
+            if not extend.any():
+                break
+            lasts = np.where(extend, nextIndices, lasts)
+            returns[extend] += discounts[extend] * self.rewards[lasts[extend]]
+            discounts[extend] *= gamma
+            extend &= ~self.dones[lasts]
+        return self.states[indices], self.actions[indices], returns, self.nextStates[lasts], self.dones[lasts], discounts
+
+    def sampleIndices(self, batchSize):
+        return np.random.randint(0, self.size, size=min(self.size, batchSize))
+
+    def getBatch(self, indices):
+        return self.states[indices], self.actions[indices], self.rewards[indices], self.nextStates[indices], self.dones[indices]
+
+    def sample(self, batchSize): ## Returns states, actions, rewards, nextStates, dones as arrays ready for DQN.train
+        return self.getBatch(self.sampleIndices(batchSize))
+
+    def nbytes(self):
+        return self.states.nbytes + self.actions.nbytes + self.rewards.nbytes + self.nextStates.nbytes + self.dones.nbytes + self.nextIndices.nbytes
+
+
+class SumTree():
+    ## Binary tree stored in a flat array: node i has children 2i and 2i+1, leaves live at [capacity, 2*capacity).
+    ## Every internal node holds the sum of its children so proportional sampling and updates are O(log n).
+    def __init__(self, capacity, tree=None): ## tree is an optional preallocated array of 2 * capacity float64s
+        self.capacity = capacity
+        self.tree = np.zeros(2 * capacity, dtype=np.float64) if tree is None else tree
+
+    @property
+    def total(self):
+        return self.tree[1]
+
+    def get(self, indices):
+        return self.tree[indices + self.capacity]
+
+    def update(self, index, priority):
+        i = index + self.capacity
+        self.tree[i] = priority
+        i //= 2
+        while i >= 1:
+            self.tree[i] = self.tree[2 * i] + self.tree[2 * i + 1]
+            i //= 2
+
+    def updateBatch(self, indices, priorities):
+        nodes = np.asarray(indices) + self.capacity
+        self.tree[nodes] = priorities ## Duplicate indices keep the last priority
+        nodes = np.unique(nodes // 2)
+        while len(nodes) and nodes[-1] >= 1:
+            nodes = nodes[nodes >= 1]
+            self.tree[nodes] = self.tree[2 * nodes] + self.tree[2 * nodes + 1]
+            nodes = np.unique(nodes // 2)
+
+    def find(self, values): ## values is array of prefix sums in [0, total), returns leaf indices
+        nodes = np.ones(len(values), dtype=np.int64)
+        values = np.array(values, dtype=np.float64)
+        internal = nodes < self.capacity
+        while np.any(internal):
+            left = 2 * nodes[internal]
+            leftSums = self.tree[left]
+            goRight = values[internal] > leftSums
+            values[internal] -= np.where(goRight, leftSums, 0.0)
+            nodes[internal] = left + goRight
+            internal = nodes < self.capacity
+        return nodes - self.capacity
+
+
+class PrioritizedReplayBuffer(ReplayBuffer):
+    ## Proportional prioritized experience replay (Schaul et al. 2015) on top of the ring buffer.
+    ## New transitions get the current max priority so each is replayed at least once.
+    persistedFields = ReplayBuffer.persistedFields + ['beta', 'maxPriority']
+
+    def __init__(self, capacity, stateSize, alpha=0.6, beta=0.4, betaIncrement=0.0005, epsilon=1e-6, directory=None, linked=True):
+        self.alpha = alpha ## How strongly TD error skews sampling, 0 is uniform
+        self.beta = beta ## Importance-sampling correction, annealed towards 1
+        self.betaIncrement = betaIncrement
+        self.epsilon = epsilon
+        self.maxPriority = 1.0
+        super().__init__(capacity, stateSize, directory, linked) ## After the defaults, a persisted beta and maxPriority replace them
+        self.tree = SumTree(capacity, self.allocate('tree', (2 * capacity,), np.float64))
+
+    def add(self, state, action, reward, nextState, done, stream=0):
+        i = super().add(state, action, reward, nextState, done, stream)
+        self.tree.update(i, self.maxPriority ** self.alpha)
+        return i
+
+    def addBatch(self, states, actions, rewards, nextStates, dones, streams=None):
+        indices = super().addBatch(states, actions, rewards, nextStates, dones, streams)
+        self.tree.updateBatch(indices, np.full(len(indices), self.maxPriority ** self.alpha))
+        return indices
+
+    def sampleIndices(self, batchSize):
+        ## Stratified: one uniform draw from each of batchSize equal segments of the total priority mass
+        batchSize = min(self.size, batchSize)
+        segment = self.tree.total / batchSize
+        values = (np.arange(batchSize) + np.random.random(batchSize)) * segment
+        return np.minimum(self.tree.find(values), self.size - 1)
+
+    def sampleWeighted(self, batchSize): ## Returns indices and their importance-sampling weights
+        indices = self.sampleIndices(batchSize)
+        probabilities = self.tree.get(indices) / self.tree.total
+        weights = (self.size * probabilities) ** -self.beta
+        weights /= weights.max() ## Normalise by the batch max so weights only ever scale updates down
+        self.beta = min(1.0, self.beta + self.betaIncrement)
+        return indices, weights.astype(np.float32)
+
+    def sample(self, batchSize): ## Returns states, actions, rewards, nextStates, dones, indices, weights
+        indices, weights = self.sampleWeighted(batchSize)
+        return self.getBatch(indices) + (indices, weights)
+
+    def updatePriorities(self, indices, tdErrors):
+        priorities = np.abs(tdErrors) + self.epsilon
+        self.maxPriority = max(self.maxPriority, float(priorities.max()))
+        self.tree.updateBatch(indices, priorities ** self.alpha)
@@ -0,0 +1,73 @@
+import numpy as np
+
+from LunarLanderEnvironment import LunarLanderEnvironment
+from NumpyLanders import NumpyLanders
+
+#===========================================================================================
+### Classes
+#===========================================================================================
+class VecLunarLander():
+    ## Holds numEnvs independent LunarLanderEnvironments and steps them together.
+    ## step() returns the true successor states (terminal states for finished landers) so they can go
+    ## straight into replay memory, while self.states holds the states to act on next, with finished
+    ## sub-episodes already auto-reset. With a seed, env i draws its initial conditions from seed + i.
+    ## backend='numpy' steps all landers together in NumpyLanders instead of one pymunk space per lander.
+    def __init__(self, numEnvs, maxSteps, test=False, seed=None, backend='pymunk', **envKwargs):
+        self.numEnvs = numEnvs
+        self.maxSteps = maxSteps
+        self.test = test
+        if backend == 'pymunk':
+            self.envs = [LunarLanderEnvironment(seed=None if seed is None else seed + i, **envKwargs) for i in range(numEnvs)]
+            self.physics = None
+            template = self.envs[0]
+        elif backend == 'numpy':
+            template = LunarLanderEnvironment(**envKwargs) ## Only read for its settings and lander geometry
+            self.envs = []
+            self.physics = NumpyLanders(numEnvs, template, test, seed)
+        else:
+            raise ValueError(f"Unknown physics backend '{backend}', expected 'pymunk' or 'numpy'")
+
+        self.stateSpaceSize = template.stateSpaceSize
+        self.actionSpaceSize = template.actionSpaceSize
+
+        self.states = np.zeros((numEnvs, self.stateSpaceSize), dtype=np.float32)
+        self.steps = np.zeros(numEnvs, dtype=np.int64) ## Steps taken in each current sub-episode
+        self.epRewards = np.zeros(numEnvs, dtype=np.float64)
+
+    def reset(self):
+        if self.physics:
+            self.physics.reset(np.arange(self.numEnvs), self.states)
+        for i, env in enumerate(self.envs):
+            env.reset(test=self.test, out=self.states[i])
+        self.steps[:] = 0
+        self.epRewards[:] = 0
+        return self.states
+
+    def step(self, actions): ## actions is array of numEnvs action indices
+        nextStates = np.empty((self.numEnvs, self.stateSpaceSize), dtype=np.float32)
+        rewards = np.empty(self.numEnvs, dtype=np.float32)
+        dones = np.zeros(self.numEnvs, dtype=np.bool_)
+        infos = []
+
+        if self.physics:
+            rewards[:], dones[:], abortStatuses = self.physics.step(actions, self.steps, self.maxSteps, nextStates)
+            infos = [{'abortStatus': abortStatus} for abortStatus in abortStatuses]
+        for i, env in enumerate(self.envs):
+            _, rewards[i], dones[i], info = env.step(actions[i], self.steps[i], self.maxSteps, out=nextStates[i]) ## State written straight into its row
+            infos.append(info)
+        self.steps += 1
+        self.epRewards += rewards
+
+        self.states = nextStates.copy() ## New array so callers holding the previous self.states keep their values
+        finished = np.flatnonzero(dones)
+        for i in finished:
+            infos[i]['episodeSteps'] = int(self.steps[i])
+            infos[i]['episodeReward'] = float(self.epRewards[i])
+            if not self.physics:
+                self.envs[i].reset(test=self.test, out=self.states[i])
+        if self.physics and len(finished):
+            self.physics.reset(finished, self.states)
+        self.steps[finished] = 0
+        self.epRewards[finished] = 0
+
+        return nextStates, rewards, dones, infos
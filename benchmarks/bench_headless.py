@@ -0,0 +1,62 @@
+## Benchmark: import cost of LunarLanderEnvironment and steps/sec headless vs rendering every step
+## Run from the repo root: python -m benchmarks.bench_headless
+import os
+import sys
+import time
+import subprocess
+
+from LunarLanderEnvironment import LunarLanderEnvironment
+
+NUM_STEPS = 3_000
+numSteps = 460
+
+IMPORT_PROBE = """
+import sys, time, resource
+start = time.perf_counter()
+import {module}
+print(time.perf_counter() - start, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, 'pygame' in sys.modules)
+"""
+
+#===========================================================================================
+### Helper functions
+#===========================================================================================
+## Import in a fresh interpreter so nothing is already cached in sys.modules
+def timeImport(module):
+    output = subprocess.run([sys.executable, '-c', IMPORT_PROBE.format(module=module)], capture_output=True, text=True, check=True).stdout.split()
+    return float(output[-3]), int(output[-2]), output[-1] == 'True'
+
+def stepsPerSecond(env, render):
+    nextState = env.reset()
+    step = 0
+    start = time.perf_counter()
+    for i in range(NUM_STEPS):
+        nextState, reward, done, info = env.step(i % env.actionSpaceSize, step, numSteps)
+        step += 1
+        if render:
+            env.render("")
+        if done:
+            nextState = env.reset()
+            step = 0
+    return NUM_STEPS / (time.perf_counter() - start)
+
+#===========================================================================================
+### Benchmark
+#===========================================================================================
+if __name__ == '__main__':
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy') ## No display needed for the rendered comparison
+
+    envImportTime, envMaxRss, pygameLoaded = timeImport('LunarLanderEnvironment')
+    pygameImportTime, pygameMaxRss, _ = timeImport('pygame, pymunk.pygame_util')
+    print(f"import LunarLanderEnvironment: {envImportTime * 1000: >8.1f} ms, max RSS {envMaxRss / 1024: >6.1f} MB, pygame loaded: {pygameLoaded}")
+    print(f"import pygame (now deferred):  {pygameImportTime * 1000: >8.1f} ms, max RSS {pygameMaxRss / 1024: >6.1f} MB")
+
+    headless = stepsPerSecond(LunarLanderEnvironment(seed=1), render=False)
+
+    renderedEnv = LunarLanderEnvironment(fps=0, seed=1) ## clock.tick(0) never sleeps, so this is the uncapped cost of drawing
+    renderedEnv.renderInit()
+    rendered = stepsPerSecond(renderedEnv, render=True)
+    renderedEnv.closeRender()
+
+    print(f"Headless steps/sec:            {headless: >10,.0f}")
+    print(f"Rendered steps/sec (uncapped): {rendered: >10,.0f}")
+    print(f"Rendered steps/sec (FPS cap):  {LunarLanderEnvironment().fps: >10,.0f}")
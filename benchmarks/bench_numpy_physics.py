@@ -0,0 +1,85 @@
+## Benchmark: NumpyLanders against pymunk, trajectory agreement and lander steps/sec as the batch grows
+## Run from the repo root: python -m benchmarks.bench_numpy_physics
+import time
+import collections
+import numpy as np
+
+from VecLunarLander import VecLunarLander
+from CheckpointRegistry import CheckpointRegistry
+from Policy import Policy
+
+NUM_STEPS = 200
+BATCH_SIZES = [1, 16, 256, 4096]
+PYMUNK_MAX_BATCH = 256 ## One pymunk space per lander, larger batches only take longer
+STATE_TOLERANCE = 1e-6
+numSteps = 460
+
+#===========================================================================================
+### Helper functions
+#===========================================================================================
+## Free flight (training mode, no platform): the same seeded landers and actions must give the same states and dones
+def checkFreeFlight(numEnvs, numStepsChecked):
+    pymunkEnv = VecLunarLander(numEnvs, numSteps, seed=3)
+    numpyEnv = VecLunarLander(numEnvs, numSteps, seed=3, backend='numpy')
+    maxDiff = np.abs(pymunkEnv.reset() - numpyEnv.reset()).max()
+    episodes = 0
+    rng = np.random.default_rng(0)
+    for i in range(numStepsChecked):
+        actions = rng.integers(0, pymunkEnv.actionSpaceSize, numEnvs)
+        pymunkStates, pymunkRewards, pymunkDones, _ = pymunkEnv.step(actions)
+        numpyStates, numpyRewards, numpyDones, _ = numpyEnv.step(actions)
+        assert np.array_equal(pymunkDones, numpyDones), f"Backends disagree on which landers finished at step {i}"
+        maxDiff = max(maxDiff, np.abs(pymunkStates - numpyStates).max(), np.abs(pymunkRewards - numpyRewards).max())
+        episodes += int(pymunkDones.sum())
+    assert maxDiff < STATE_TOLERANCE, f"Free-flight states differ by {maxDiff}"
+    return maxDiff, episodes
+
+## Test mode (platform, approximate contact): first-episode outcomes of a trained policy on both backends
+def compareLandings(policy, numEnvs):
+    outcomes = {}
+    for backend in ['pymunk', 'numpy']:
+        env = VecLunarLander(numEnvs, 600, test=True, seed=11, backend=backend)
+        states = env.reset()
+        results = [None] * numEnvs
+        while any(result is None for result in results):
+            nextStates, rewards, dones, infos = env.step(np.argmax(policy.predict(states), axis=1))
+            states = env.states
+            for i in np.flatnonzero(dones):
+                if results[i] is None:
+                    results[i] = (infos[i]['abortStatus'], infos[i]['episodeSteps'])
+        outcomes[backend] = results
+    agreement = np.mean([a[0] == b[0] for a, b in zip(outcomes['pymunk'], outcomes['numpy'])])
+    stepDiffs = [abs(a[1] - b[1]) for a, b in zip(outcomes['pymunk'], outcomes['numpy'])]
+    return outcomes, agreement, stepDiffs
+
+def landerStepsPerSecond(numEnvs, backend):
+    env = VecLunarLander(numEnvs, numSteps, seed=1, backend=backend)
+    env.reset()
+    actions = np.random.randint(0, env.actionSpaceSize, size=(NUM_STEPS, numEnvs))
+    start = time.perf_counter()
+    for i in range(NUM_STEPS):
+        env.step(actions[i])
+    return NUM_STEPS * numEnvs / (time.perf_counter() - start)
+
+#===========================================================================================
+### Benchmark
+#===========================================================================================
+if __name__ == '__main__':
+    np.random.seed(1)
+
+    maxDiff, episodes = checkFreeFlight(16, 3_000)
+    print(f"Free flight: max state/reward difference {maxDiff:.2e} over {episodes} episodes, dones identical\n")
+
+    best = CheckpointRegistry('./lunar_lander_models').list()
+    if best:
+        outcomes, agreement, stepDiffs = compareLandings(Policy.load(best[0]['path']), 100)
+        for backend, results in outcomes.items():
+            print(f"{backend: <7} landings: {dict(collections.Counter(result[0] for result in results))}")
+        print(f"Abort status agreement: {agreement:.0%}, episode length difference median {np.median(stepDiffs):.0f}, max {max(stepDiffs)} steps\n")
+    else:
+        print("No saved models, skipping the landing comparison\n")
+
+    print(f"{'Landers': >8} {'pymunk steps/s': >16} {'NumPy steps/s': >15}")
+    for numEnvs in BATCH_SIZES:
+        pymunkRate = f"{landerStepsPerSecond(numEnvs, 'pymunk'): >16,.0f}" if numEnvs <= PYMUNK_MAX_BATCH else f"{'-': >16}"
+        print(f"{numEnvs: >8} {pymunkRate} {landerStepsPerSecond(numEnvs, 'numpy'): >15,.0f}")
@@ -0,0 +1,66 @@
+## Benchmark: uniform vs prioritized replay sampling throughput at 1e5 and 1e6 capacity
+## Run from the repo root: python -m benchmarks.bench_replay
+import time
+import numpy as np
+
+from ReplayBuffer import ReplayBuffer, PrioritizedReplayBuffer
+
+CAPACITIES = [100_000, 1_000_000]
+STATE_SIZE = 4
+BATCH_SIZE = 64
+NUM_BATCHES = 2_000
+
+#===========================================================================================
+### Helper functions
+#===========================================================================================
+def fillBuffer(buffer):
+    ## Write the arrays directly instead of calling add() a million times, then set random priorities in one pass
+    buffer.states[:] = np.random.normal(size=buffer.states.shape)
+    buffer.nextStates[:] = np.random.normal(size=buffer.nextStates.shape)
+    buffer.actions[:] = np.random.randint(0, 6, size=buffer.capacity)
+    buffer.rewards[:] = np.random.normal(size=buffer.capacity)
+    buffer.size = buffer.capacity
+    if isinstance(buffer, PrioritizedReplayBuffer):
+        buffer.tree.updateBatch(np.arange(buffer.capacity), np.random.random(buffer.capacity) ** buffer.alpha)
+
+def timeSampling(buffer):
+    start = time.perf_counter()
+    for i in range(NUM_BATCHES):
+        buffer.sample(BATCH_SIZE)
+    return NUM_BATCHES * BATCH_SIZE / (time.perf_counter() - start)
+
+def timePriorityUpdates(buffer):
+    indices = [buffer.sampleIndices(BATCH_SIZE) for i in range(NUM_BATCHES)]
+    tdErrors = np.random.normal(size=(NUM_BATCHES, BATCH_SIZE))
+    start = time.perf_counter()
+    for i in range(NUM_BATCHES):
+        buffer.updatePriorities(indices[i], tdErrors[i])
+    return NUM_BATCHES * BATCH_SIZE / (time.perf_counter() - start)
+
+def checkProportional(buffer):
+    ## Empirical sampling frequencies must match priority / total
+    leaves = np.random.random(buffer.capacity)
+    buffer.tree.updateBatch(np.arange(buffer.capacity), leaves)
+    assert np.isclose(buffer.tree.total, leaves.sum())
+    counts = np.bincount(np.concatenate([buffer.sampleIndices(BATCH_SIZE) for i in range(20_000)]), minlength=buffer.capacity)
+    expected = leaves / leaves.sum() * counts.sum()
+    assert np.max(np.abs(counts - expected) / np.sqrt(expected)) < 6, "Sum-tree sampling is not proportional to priority"
+
+#===========================================================================================
+### Benchmark
+#===========================================================================================
+if __name__ == '__main__':
+    np.random.seed(1)
+
+    smallBuffer = PrioritizedReplayBuffer(100, STATE_SIZE, alpha=1.0)
+    smallBuffer.size = smallBuffer.capacity
+    checkProportional(smallBuffer)
+    print("Sum-tree sampling is proportional: True\n")
+
+    print(f"{'Capacity': >10} {'Uniform sample/s': >18} {'Prioritized sample/s': >22} {'Priority update/s': >19}")
+    for capacity in CAPACITIES:
+        uniform = ReplayBuffer(capacity, STATE_SIZE)
+        fillBuffer(uniform)
+        prioritized = PrioritizedReplayBuffer(capacity, STATE_SIZE)
+        fillBuffer(prioritized)
+        print(f"{capacity: >10} {timeSampling(uniform): >18,.0f} {timeSampling(prioritized): >22,.0f} {timePriorityUpdates(prioritized): >19,.0f}")
@@ -0,0 +1,35 @@
+## Benchmark: resets/sec with the in-place training reset vs rebuilding the space and lander every episode
+## Run from the repo root: python -m benchmarks.bench_reset
+import time
+from pymunk.vec2d import Vec2d
+
+from LunarLanderEnvironment import LunarLanderEnvironment
+
+NUM_RESETS = 20_000
+
+#===========================================================================================
+### Helper functions
+#===========================================================================================
+def resetsPerSecond(resetFn):
+    start = time.perf_counter()
+    for i in range(NUM_RESETS):
+        resetFn()
+    return NUM_RESETS / (time.perf_counter() - start)
+
+#===========================================================================================
+### Benchmark
+#===========================================================================================
+if __name__ == '__main__':
+    env = LunarLanderEnvironment(seed=1)
+    env.step(2, 0, 460) ## Leave the body moving so the in-place path has something to undo
+
+    inPlace = resetsPerSecond(lambda: env.reset(test=False))
+    ## What every training reset used to do: a new Space, Lander and shapes, then the initial state
+    position = Vec2d(env.displayWidth / 2, env.displayHeight / 2)
+    rebuilt = resetsPerSecond(lambda: (env.buildSpace(position, False), env.getStateReward()))
+    testResets = resetsPerSecond(lambda: env.reset(test=True))
+
+    print(f"In-place training resets/sec:  {inPlace: >10,.0f}")
+    print(f"Rebuilt training resets/sec:   {rebuilt: >10,.0f}")
+    print(f"Speedup:                       {inPlace / rebuilt: >10.1f}x")
+    print(f"Test resets/sec (rebuilt):     {testResets: >10,.0f}")
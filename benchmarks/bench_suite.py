@@ -0,0 +1,181 @@
+## Benchmark suite: env, agent, replay, render and end-to-end training throughput, written as JSON to compare across commits
+## Run from the repo root: python -m benchmarks.bench_suite [--json out.json] [--quick]
+##   (defaults to bench-<commit>.json, runs headless on CPU)
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import subprocess
+import numpy as np
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy') ## Render without a display
+os.environ.setdefault('TF_CPP_MIN_LOG_LEVEL', '3')
+
+from LunarLanderEnvironment import LunarLanderEnvironment
+from VecLunarLander import VecLunarLander
+from ReplayBuffer import ReplayBuffer, PrioritizedReplayBuffer
+from Policy import Policy
+
+BATCH_SIZES = [1, 4, 16, 64, 256, 1024]
+numSteps = 460
+
+#===========================================================================================
+### Helper functions
+#===========================================================================================
+def rate(fn, count):
+    start = time.perf_counter()
+    fn()
+    return count / (time.perf_counter() - start)
+
+def latency(fn, repeats):
+    fn() ## Warm up, the first call may trace a graph
+    times = np.empty(repeats)
+    for i in range(repeats):
+        start = time.perf_counter()
+        fn()
+        times[i] = time.perf_counter() - start
+    return {'mean': float(times.mean()), 'p50': float(np.percentile(times, 50)), 'p99': float(np.percentile(times, 99))}
+
+def commitHash():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def benchEnv(numSteps, numResets):
+    env = LunarLanderEnvironment(seed=1)
+    def run():
+        env.reset()
+        step = 0
+        for i in range(numSteps):
+            nextState, reward, done, info = env.step(i % env.actionSpaceSize, step, 460)
+            step += 1
+            if done:
+                env.reset()
+                step = 0
+    return {'stepsPerSec': rate(run, numSteps),
+            'trainingResetsPerSec': rate(lambda: [env.reset(test=False) for i in range(numResets)], numResets),
+            'testResetsPerSec': rate(lambda: [env.reset(test=True) for i in range(numResets)], numResets)
+            }
+
+def benchRender(numFrames):
+    env = LunarLanderEnvironment(fps=0, seed=1) ## clock.tick(0) never sleeps, so this is the uncapped cost of drawing
+    env.reset(test=True)
+    env.renderInit()
+    def run():
+        step = 0
+        for i in range(numFrames):
+            nextState, reward, done, info = env.step(i % env.actionSpaceSize, step, 460)
+            step += 1
+            env.render("")
+            if done:
+                env.reset(test=True)
+                step = 0
+    framesPerSec = rate(run, numFrames)
+    env.closeRender()
+    return {'framesPerSec': framesPerSec}
+
+def benchSelectAction(agent, policy, repeats):
+    results = {}
+    for batchSize in BATCH_SIZES:
+        states = np.random.normal(size=(batchSize, agent.numInputs)).astype(np.float32)
+        results[batchSize] = {'dqnSelectActions': latency(lambda: agent.selectActions(states, 0), repeats),
+                              'policyPredict': latency(lambda: policy.predict(states), repeats)
+                              }
+    results['single'] = {'dqnSelectAction': latency(lambda: agent.selectAction(states[0], 0), repeats),
+                         'policySelectAction': latency(lambda: policy.selectAction(states[0]), repeats)
+                         }
+    return results
+
+def benchReplay(numTransitions, numBatches, stateSize, batchSize):
+    results = {}
+    for name, buffer in [('uniform', ReplayBuffer(numTransitions, stateSize)), ('prioritized', PrioritizedReplayBuffer(numTransitions, stateSize))]:
+        states = np.random.normal(size=(numTransitions, stateSize)).astype(np.float32)
+        actions = np.random.randint(0, 6, size=numTransitions)
+        rewards = np.random.normal(size=numTransitions).astype(np.float32)
+        dones = np.random.random(numTransitions) < 0.01
+        addRate = rate(lambda: [buffer.add(states[i], actions[i], rewards[i], states[i], dones[i]) for i in range(numTransitions)], numTransitions)
+        addBatchRate = rate(lambda: [buffer.addBatch(states[i:i + 64], actions[i:i + 64], rewards[i:i + 64], states[i:i + 64], dones[i:i + 64]) for i in range(0, numTransitions, 64)], numTransitions)
+        sampleRate = rate(lambda: [buffer.sample(batchSize) for i in range(numBatches)], numBatches * batchSize)
+        results[name] = {'rememberPerSec': addRate, 'rememberBatchPerSec': addBatchRate, 'samplesPerSec': sampleRate}
+    return results
+
+def benchTrain(agent, env, numTransitions, numCalls):
+    states = env.reset()
+    for i in range(numTransitions // env.numEnvs):
+        actions = np.random.randint(0, env.actionSpaceSize, size=env.numEnvs)
+        nextStates, rewards, dones, infos = env.step(actions)
+        agent.rememberBatch(states, actions, rewards, nextStates, dones)
+        states = env.states
+    agent.train() ## Warm up
+    return {'transitionsPerSec': rate(lambda: [agent.train() for i in range(numCalls)], numCalls * agent.replayBatchSize),
+            'batchSize': agent.replayBatchSize}
+
+## The training script's inner loop without tests, saving or printing: act, remember, and the gradient steps the update ratio owes
+def benchEpisodes(agent, numEpisodes, numEnvs):
+    env = VecLunarLander(numEnvs, numSteps, seed=1)
+    states = env.reset()
+    agent.pendingUpdates = 0.0 ## Only the updates this loop's own transitions owe, not benchTrain's
+    episodes = 0
+    steps = 0
+    start = time.perf_counter()
+    while episodes < numEpisodes:
+        actions = agent.selectActions(states, 0.5)
+        nextStates, rewards, dones, infos = env.step(actions)
+        agent.rememberBatch(states, actions, rewards, nextStates, dones)
+        states = env.states
+        agent.trainPending()
+        steps += numEnvs
+        episodes += int(dones.sum())
+    elapsed = time.perf_counter() - start
+    return {'episodesPerHour': episodes / elapsed * 3600, 'envStepsPerSec': steps / elapsed, 'episodes': episodes, 'numEnvs': numEnvs}
+
+#===========================================================================================
+### Benchmark
+#===========================================================================================
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Lunar lander throughput benchmarks")
+    parser.add_argument('--json', default=None)
+    parser.add_argument('--quick', action='store_true', help="Fewer repeats, for checking the suite runs")
+    args = parser.parse_args()
+    scale = 0.1 if args.quick else 1
+
+    import tensorflow as tf
+    from DQN import DQN
+    np.random.seed(1)
+    tf.random.set_seed(1)
+
+    results = {'commit': commitHash(), 'timestamp': time.time(), 'python': sys.version.split()[0], 'tensorflow': tf.__version__,
+               'platform': platform.platform(), 'cpus': os.cpu_count()}
+
+    env = LunarLanderEnvironment(seed=1)
+    agent = DQN(env.stateSpaceSize, env.actionSpaceSize)
+    policy = Policy(agent.model.get_weights())
+
+    results['env'] = benchEnv(int(20_000 * scale), int(5_000 * scale))
+    results['render'] = benchRender(int(1_000 * scale))
+    results['selectAction'] = benchSelectAction(agent, policy, max(int(200 * scale), 5))
+    results['replay'] = benchReplay(int(50_000 * scale), int(2_000 * scale), env.stateSpaceSize, agent.replayBatchSize)
+    results['train'] = benchTrain(agent, VecLunarLander(8, numSteps, seed=1), int(5_000 * scale), int(100 * scale))
+    results['endToEnd'] = benchEpisodes(agent, max(int(10 * scale), 2), 1)
+
+    print(f"Env steps/sec:                 {results['env']['stepsPerSec']: >12,.0f}")
+    print(f"Env training resets/sec:       {results['env']['trainingResetsPerSec']: >12,.0f}")
+    print(f"Env test resets/sec:           {results['env']['testResetsPerSec']: >12,.0f}")
+    print(f"Render frames/sec (uncapped):  {results['render']['framesPerSec']: >12,.0f}")
+    print(f"train() transitions/sec:       {results['train']['transitionsPerSec']: >12,.0f}")
+    print(f"Episodes/hour (1 env):         {results['endToEnd']['episodesPerHour']: >12,.0f}")
+    print(f"\n{'Replay': <12} {'remember/s': >12} {'rememberBatch/s': >16} {'sample/s': >12}")
+    for name, stats in results['replay'].items():
+        print(f"{name: <12} {stats['rememberPerSec']: >12,.0f} {stats['rememberBatchPerSec']: >16,.0f} {stats['samplesPerSec']: >12,.0f}")
+    print(f"\n{'Batch': >6} {'DQN p50 ms': >11} {'DQN p99 ms': >11} {'NumPy p50 ms': >13} {'NumPy p99 ms': >13}")
+    for batchSize in BATCH_SIZES:
+        dqn, numpy = results['selectAction'][batchSize]['dqnSelectActions'], results['selectAction'][batchSize]['policyPredict']
+        print(f"{batchSize: >6} {dqn['p50'] * 1e3: >11.3f} {dqn['p99'] * 1e3: >11.3f} {numpy['p50'] * 1e3: >13.3f} {numpy['p99'] * 1e3: >13.3f}")
+
+    jsonPath = args.json or f"bench-{results['commit'] or 'local'}.json"
+    with open(jsonPath, 'w') as f:
+        json.dump(results, f, indent=1)
+    print(f"\nWritten to {jsonPath}")
@@ -0,0 +1,82 @@
+## Micro-benchmark: per-sample vs batched TD target computation in DQN.train
+## Run from the repo root: python -m benchmarks.bench_train
+import random
+import time
+import numpy as np
+
+from LunarLanderEnvironment import LunarLanderEnvironment
+from DQN import DQN
+
+NUM_TRANSITIONS = 2_000
+NUM_REPEATS = 5
+numSteps = 460
+
+#===========================================================================================
+### Helper functions
+#===========================================================================================
+def collectTransitions(env, agent, numTransitions):
+    nextState = env.reset()
+    step = 0
+    for i in range(numTransitions):
+        state = nextState
+        action = random.randrange(env.actionSpaceSize)
+        nextState, reward, done, info = env.step(action, step, numSteps)
+        step += 1
+        agent.remember((state, action, reward, nextState, done))
+        if done:
+            nextState = env.reset()
+            step = 0
+
+## Reference implementation: the original per-transition loop with two predict() calls each
+def computeTargetsPerSample(agent, minibatch):
+    x_batch, y_batch = [], []
+    for transition in zip(*minibatch):
+        state, action, reward, nextState, done = transition
+        qValues = agent.model.predict_on_batch(np.array([state]))[0]
+        qValues[action] = reward if done else reward + agent.gamma * np.max(agent.targetModel.predict_on_batch(np.array([nextState]))[0])
+        x_batch.append(state)
+        y_batch.append(qValues)
+    return np.array(x_batch), np.array(y_batch)
+
+def computeTargetsBatched(agent, minibatch):
+    states, actions, rewards, nextStates, dones = minibatch
+    return states, agent.computeTargets(states, actions, rewards, nextStates, dones)[0]
+
+def timeIt(fn, *args):
+    start = time.perf_counter()
+    for i in range(NUM_REPEATS):
+        result = fn(*args)
+    return (time.perf_counter() - start) / NUM_REPEATS, result
+
+#===========================================================================================
+### Benchmark
+#===========================================================================================
+if __name__ == '__main__':
+    random.seed(1)
+    np.random.seed(1)
+
+    env = LunarLanderEnvironment(seed=1)
+    agent = DQN(env.stateSpaceSize, env.actionSpaceSize)
+    agent.targetModel.set_weights([w + np.random.normal(0, 0.1, w.shape) for w in agent.model.get_weights()]) ## Make target differ from online so the bootstrap term matters
+    collectTransitions(env, agent, NUM_TRANSITIONS)
+    minibatch = agent.replay_memory.sample(agent.replayBatchSize)
+
+    ## Warm up both paths so graph tracing is not counted
+    computeTargetsPerSample(agent, minibatch)
+    computeTargetsBatched(agent, minibatch)
+
+    perSampleTime, (perSampleX, perSampleY) = timeIt(computeTargetsPerSample, agent, minibatch)
+    batchedTime, (batchedX, batchedY) = timeIt(computeTargetsBatched, agent, minibatch)
+
+    assert np.allclose(perSampleX, batchedX), "Per-sample and batched paths disagree on states"
+    assert np.allclose(perSampleY, batchedY, rtol=1e-5, atol=1e-4), f"Per-sample and batched paths disagree on targets (max abs diff {np.max(np.abs(perSampleY - batchedY))})"
+
+    agent.train() ## Builds the train function, also not counted
+    trainTime, _ = timeIt(agent.train)
+
+    print(f"Minibatch size:            {len(minibatch[1])}")
+    print(f"Per-sample targets:        {perSampleTime * 1000: >10.2f} ms")
+    print(f"Batched targets:           {batchedTime * 1000: >10.2f} ms")
+    print(f"Speedup:                   {perSampleTime / batchedTime: >10.1f}x")
+    print(f"Full batched train() call: {trainTime * 1000: >10.2f} ms")
+    print("Targets match: True")
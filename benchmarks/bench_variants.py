@@ -0,0 +1,95 @@
+## Benchmark: sample efficiency of the DQN variants, greedy score against environment samples with the training script's loop
+## Run from the repo root: python -m benchmarks.bench_variants [--budget 60000] [--seeds 2] [--variants dqn double ...] [--json out.json] [--quick]
+##   (each variant and seed trains a fresh agent, slow on CPU: roughly a minute per 10,000 samples)
+import os
+import json
+import time
+import argparse
+import numpy as np
+
+os.environ.setdefault('TF_CPP_MIN_LOG_LEVEL', '3')
+
+from LunarLanderEnvironment import initialConditionBank
+from VecLunarLander import VecLunarLander
+from Evaluation import evaluateScenarios, summarize
+
+VARIANTS = {'dqn': {},
+            'double': {'doubleDQN': True},
+            'dueling': {'dueling': True},
+            '3-step': {'nSteps': 3},
+            'double+dueling+3-step': {'doubleDQN': True, 'dueling': True, 'nSteps': 3}
+            } ## name: DQN keyword arguments
+NUM_ENVS = 8
+EVAL_EVERY = 5_000 ## Environment samples between greedy evaluations
+EVAL_EPISODES = 10
+TARGET_SCORE = 0.0 ## meanAvgReward, samplesToTarget is the first evaluation at or above it
+EPSILON_MIN = 0.01
+EPSILON_LOG_DECAY = 0.01
+numSteps = 460
+
+#===========================================================================================
+### Helper functions
+#===========================================================================================
+def runVariant(kwargs, seed, budget, scenarios):
+    import tensorflow as tf
+    from DQN import DQN
+    np.random.seed(seed)
+    tf.random.set_seed(seed)
+
+    env = VecLunarLander(NUM_ENVS, numSteps, seed=seed)
+    agent = DQN(env.stateSpaceSize, env.actionSpaceSize, **kwargs)
+    states = env.reset()
+    episode = 1
+    epsilon = 1.0
+    samples = 0
+    curve = []
+    while samples < budget:
+        actions = agent.selectActions(states, epsilon)
+        nextStates, rewards, dones, infos = env.step(actions)
+        agent.rememberBatch(states, actions, rewards, nextStates, dones)
+        states = env.states
+        samples += NUM_ENVS
+        agent.trainPending() ## The DQN's default update ratio and target schedule
+        for i in np.flatnonzero(dones): ## Same per-episode epsilon schedule as the training script
+            episode += 1
+            epsilon = EPSILON_MIN + (1.0 - EPSILON_MIN) * np.exp(-1 * episode * EPSILON_LOG_DECAY)
+        if samples % EVAL_EVERY < NUM_ENVS or samples >= budget:
+            summary = summarize(evaluateScenarios((agent.model.get_weights(), scenarios, numSteps, False, 1)))
+            curve.append((samples, summary['meanAvgReward']))
+    return curve
+
+def samplesToTarget(curve):
+    return next((samples for samples, score in curve if score >= TARGET_SCORE), None)
+
+#===========================================================================================
+### Benchmark
+#===========================================================================================
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Sample efficiency of DQN variants")
+    parser.add_argument('--budget', type=int, default=60_000, help="Environment samples per run")
+    parser.add_argument('--seeds', type=int, default=2)
+    parser.add_argument('--variants', nargs='+', choices=list(VARIANTS), default=list(VARIANTS))
+    parser.add_argument('--json', default=None)
+    parser.add_argument('--quick', action='store_true', help="One seed and a tiny budget, for checking the benchmark runs")
+    args = parser.parse_args()
+    if args.quick:
+        args.budget, args.seeds, EVAL_EVERY = 2_000, 1, 1_000
+
+    scenarios = list(enumerate(initialConditionBank(EVAL_EPISODES, 1000))) ## Held out from the training seeds
+    results = {}
+    for name in args.variants:
+        start = time.perf_counter()
+        curves = [runVariant(VARIANTS[name], seed, args.budget, scenarios) for seed in range(1, args.seeds + 1)]
+        finalScores = [curve[-1][1] for curve in curves]
+        reached = [samplesToTarget(curve) for curve in curves]
+        results[name] = {'curves': curves, 'finalScores': finalScores, 'samplesToTarget': reached, 'seconds': time.perf_counter() - start}
+        print(f"{name: <24} final {np.mean(finalScores): >8.2f}   samples to {TARGET_SCORE}: {reached}   ({results[name]['seconds']:.0f}s)")
+
+    print(f"\n{'Samples': >8} " + " ".join(f"{name: >22}" for name in results))
+    for k, (samples, _) in enumerate(next(iter(results.values()))['curves'][0]):
+        print(f"{samples: >8} " + " ".join(f"{np.mean([curve[k][1] for curve in result['curves']]): >22.2f}" for result in results.values()))
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'budget': args.budget, 'seeds': args.seeds, 'numEnvs': NUM_ENVS, 'evalEpisodes': EVAL_EPISODES, 'targetScore': TARGET_SCORE, 'variants': results}, f, indent=1)
+        print(f"\nWritten to {args.json}")
@@ -3,78 +3,14 @@ import os
 from tqdm import tqdm
 import time
 import numpy as np
-import tensorflow as tf
-from tensorflow.keras import models, layers, optimizers
 
 from LunarLanderEnvironment import LunarLanderEnvironment
-
-def getPrevAvgReward(checkPoint):
-  avgStr = 'avg'
-  num = ""
-  idx = 0
-  getNum = False
-  for c in checkPoint:
-      if getNum:
-          if c == avgStr[idx]:
-              break
-          else:
-              num += c
-      else:
-          if c == avgStr[idx]:
-              idx += 1
-          else:
-              idx = 0
-      if idx == 3:
-          getNum = True
-          idx = 0
-  prevAvgEpReward = float(num)
-  return prevAvgEpReward
-
-class DQN():
-    def __init__(self, numInputs, numOutputs, loadModel=None):
-        self.numInputs = numInputs
-        self.numOutputs = numOutputs
-        self.replay_memory = []
-        self.model = None
-        self.targetModel = None
-        if loadModel:
-            self.model = models.load_model(loadModel)
-            self.targetModel = self.createModel()
-        else:
-            self.model = self.createModel()
-            self.targetModel = self.createModel()
-            self.targetModel.set_weights(self.model.get_weights())
-
-    def createModel(self):
-        model = models.Sequential(
-            [layers.Dense(18, input_dim=self.numInputs, activation='tanh'),
-            layers.Dense(32, activation='tanh'),
-            layers.Dense(self.numOutputs, activation='linear')]
-        )
-        model.compile(loss='mse', optimizer=optimizers.Adam(lr=ALPHA), metrics=['accuracy'])
-        return model
-
-    def remember(self, transition):
-        if len(self.replay_memory) > REPLAY_MEMORY_SIZE:
-            self.replay_memory.pop(0)
-        self.replay_memory.append(transition)
-    
-    def selectAction(self, state, epsilon):
-        return random.randrange(env.actionSpaceSize) if (np.random.random() <= epsilon) else np.argmax(self.model.predict(np.array([state]))[0])
-
-    def updateTarget(self):
-        self.targetModel.set_weights(self.model.get_weights())
-
-    def train(self):
-        x_batch, y_batch = [], []
-        minibatch = random.sample(self.replay_memory, min(len(self.replay_memory), REPLAY_BATCH_SIZE))
-        for transition in minibatch:
-            state, action, reward, nextState, done = transition
-            qValues = self.model.predict(np.array([state]))[0]
-            qValues[action] = reward if done else reward + GAMMA * np.max(self.targetModel.predict(np.array([nextState]))[0])
-            x_batch.append(state)
-            y_batch.append(qValues)
-        self.model.fit(np.array(x_batch), np.array(y_batch), batch_size=len(minibatch), verbose=0)
+from VecLunarLander import VecLunarLander
+from ActorPool import ActorPool
+from CheckpointRegistry import CheckpointRegistry
+from BackgroundSaver import BackgroundSaver
+from Evaluation import AsyncEvaluator
+from Profiler import Profiler
 
 ALPHA = 0.00085
 ALPHA_DECAY = 0.01
@@ -85,94 +21,161 @@ EPSILON_LOG_DECAY = 0.01
 epsilon = EPSILON_MAX
 REPLAY_MEMORY_SIZE = 10_000
 REPLAY_BATCH_SIZE = 64
-UPDATE_TARGET_EVERY = 10
+UPDATE_RATIO = 1 / 64 ## SETTING Gradient steps per environment step, about the 6 per episode of earlier runs
+TARGET_UPDATE = 'hard' ## SETTING 'hard' copies the online network into the target every TARGET_UPDATE_EVERY gradient steps, 'soft' blends TAU of it in after every gradient step
+TARGET_UPDATE_EVERY = 60 ## Gradient steps
+TAU = 0.01
+PRIORITIZED_REPLAY = False ## SETTING True for proportional prioritized replay
+PER_ALPHA = 0.6
+PER_BETA = 0.4
+PER_BETA_INCREMENT = 0.0005 ## Per train() call, anneals beta towards 1
+DOUBLE_DQN = False ## SETTING True bootstraps from the target network's value of the online network's greedy action
+DUELING = False ## SETTING True splits the output layer into value and advantage heads (new models only, a resumed model keeps its own)
+N_STEPS = 1 ## SETTING Rewards summed into each TD target before bootstrapping, stopping early at the end of an episode
 
 numEpisodes = 260
 numSteps = 460
+ACTION_REPEAT = 1 ## SETTING Physics substeps per agent decision, numSteps counts decisions
 verbose = True
 TEST_EVERY = 7 ## episodes
+RENDER_TESTS = False ## SETTING True draws each test episode in this process and blocks training while it plays
+TEST_EPISODES = 5 ## SETTING Headless test episodes per snapshot, run by a separate process on a fixed bank of initial conditions
+NUM_ENVS = 1 ## SETTING Landers stepped together, each action selection is one batched forward pass
+PHYSICS_BACKEND = 'pymunk' ## SETTING 'numpy' steps all NUM_ENVS landers together as arrays (NumpyLanders), faster from about 16 landers
+NUM_ACTORS = 0 ## SETTING Worker processes collecting experience, 0 collects in this process through NUM_ENVS
 if not os.path.isdir('lunar_lander_models'):
     os.makedirs('lunar_lander_models')
 MODEL_NAME = "stateSpace=desAccXY,angle,angVel_actionSpace=left,right,rear_rewardSpace=desAccRT40,angVelRT0.5_notes=sideThrusters(+-4.6,0.3),desVelMaxMag44" ## SETTING
-prevAvgReward = None ## SETTING None or prev
-checkPoint = "./lunar_lander_models/" + MODEL_NAME + "-avg" + str(prevAvgReward) + "avg.model" if prevAvgReward else None
-
-# For more repetitive results
-# random.seed(1)
-# np.random.seed(1)
-# tf.set_random_seed(1)
-
-epRewards = []
-
-env = LunarLanderEnvironment()
-agent = DQN(env.stateSpaceSize, env.actionSpaceSize, loadModel=None)
-
-for episode in range(1, numEpisodes+1):
-    if episode % TEST_EVERY == 0:
-        if verbose: print(f"\nTesting on episode {episode}...")
-        nextState = env.reset(test=False)
-        env.renderInit()
-        
-        step = 0
-        epReward = 0
-        done = False
-
-        while not done:
-            state = nextState
-            action = agent.selectAction(state, 0)
-            nextState, reward, done, info = env.step(action, step, numSteps)
-            step += 1
-            epReward += reward
-
-            report = f"State: {state[0]: >8.2f}, {state[1]: >8.2f}   Action: {action: >8.2f}   Reward: {reward: >8.2f}"
-            print(report)
-            env.render(report)
-            
-            if done:
-                print(f"Abort status: {info['abortStatus']}")
-                break
-        avgReward = epReward / step
-        if verbose: print(f"Testing on episode {episode} finished after {step} steps, avgReward: {avgReward}")
-        env.closeRender()
-
-        ## Save model if it performed better this during render than last during render
-        if checkPoint:
-            prevAvgReward = getPrevAvgReward(checkPoint)
-        else:
-            prevAvgReward = -float('inf')
-        if avgReward >= prevAvgReward:
-            checkPoint = "./lunar_lander_models/" + MODEL_NAME + "-avg" + str(avgReward) + "avg.model"
-            agent.model.save(f'{checkPoint}')
-            print("Model saved")
-
-    if episode % UPDATE_TARGET_EVERY == 0:
-        agent.updateTarget()
-        if verbose: print("Target updated")
-
-    if verbose: print(f"\nStarting episode {episode}...")
-    nextState = env.reset(test=False)
-    epsilon = EPSILON_MIN + (EPSILON_MAX - EPSILON_MIN) * np.exp(-1 * (episode) * EPSILON_LOG_DECAY)
-    if verbose: print(f"Epsilon: {epsilon}")
-
+RESUME_BEST = False ## SETTING True carries on from the best model registered for MODEL_NAME: its weights, its episode for the epsilon schedule, and only saving models that beat it
+PERSIST_REPLAY = False ## SETTING True keeps replay memory in memory-mapped .npy files in lunar_lander_models/MODEL_NAME.replay, flushed with each saved model and reopened on the next run
+KEEP_TOP_CHECKPOINTS = None ## SETTING None keeps every saved model, otherwise deletes all but the best K saved for MODEL_NAME (never imported legacy ones)
+PROFILE = False ## SETTING True times env and DQN calls, printing a table and appending JSON to PROFILE_PATH after every episode (learner side only with NUM_ACTORS)
+PROFILE_PATH = './lunar_lander_profile.jsonl'
+SEED = None ## SETTING An int makes runs repeatable: lander i starts from its own generator seeded SEED + i, exploration and initial weights follow SEED
+
+def saveIfBest(episode, weights, avgReward):
+    global bestAvgReward
+    ## Save model if it performed better in this test than in the best test so far
+    if avgReward >= bestAvgReward:
+        bestAvgReward = avgReward
+        checkPoint = "./lunar_lander_models/" + MODEL_NAME + "-avg" + str(avgReward) + "avg.model"
+        saver.save(weights, checkPoint, MODEL_NAME, episode, avgReward) ## Written and registered by the saver thread
+        print("Model saved")
+
+def renderedTest(episode): ## Blocks training while one test episode is drawn at the display FPS
+    if verbose: print(f"\nTesting on episode {episode}...")
+    nextState = testEnv.reset(test=False)
+    testEnv.renderInit()
+    
     step = 0
     epReward = 0
     done = False
 
     while not done:
         state = nextState
-        action = agent.selectAction(state, epsilon)
-        nextState, reward, done, info = env.step(action, step, numSteps)
+        action = agent.selectAction(state, 0)
+        nextState, reward, done, info = testEnv.step(action, step, numSteps)
         step += 1
         epReward += reward
 
-        agent.remember((state, action, reward, nextState, done))
+        report = f"State: {state[0]: >8.2f}, {state[1]: >8.2f}   Action: {action: >8.2f}   Reward: {reward: >8.2f}"
+        print(report)
+        testEnv.render(report)
         
         if done:
             print(f"Abort status: {info['abortStatus']}")
             break
-    epRewards.append(epReward)
     avgReward = epReward / step
-    if verbose: print(f"Episode {episode} finished after {step} steps, avgReward: {avgReward}")
-    if verbose: print("Training...")
-    for i in range(6):
-        agent.train()
\ No newline at end of file
+    if verbose: print(f"Testing on episode {episode} finished after {step} steps, avgReward: {avgReward}")
+    testEnv.closeRender()
+    saveIfBest(episode, agent.model.get_weights(), avgReward)
+
+def collectTests(wait=False): ## Save-best decisions for background tests that have finished
+    for testEpisode, weights, summary in evaluator.poll(wait):
+        if verbose: print(f"Testing on episode {testEpisode} finished, avgReward: {summary['meanAvgReward']}, landed: {summary['statusCounts']['safe']}/{summary['episodes']}")
+        saveIfBest(testEpisode, weights, summary['meanAvgReward'])
+
+def beginEpisode(episode): ## Periodic test and epsilon schedule, run as each new episode starts
+    if episode % TEST_EVERY == 0:
+        if RENDER_TESTS:
+            renderedTest(episode)
+        else:
+            evaluator.submit(agent.model.get_weights(), episode)
+            if verbose: print(f"\nTesting on episode {episode} in the background...")
+
+    if verbose: print(f"\nStarting episode {episode}...")
+    epsilon = EPSILON_MIN + (EPSILON_MAX - EPSILON_MIN) * np.exp(-1 * (episode) * EPSILON_LOG_DECAY)
+    if verbose: print(f"Epsilon: {epsilon}")
+    if actorPool:
+        actorPool.broadcast(agent.model.get_weights(), epsilon)
+    return epsilon
+
+if __name__ == '__main__': ## Spawned actor processes re-import this script, keep TensorFlow and training out of them
+    import tensorflow as tf
+    from DQN import DQN
+
+    if SEED is not None: ## For more repetitive results
+        random.seed(SEED)
+        np.random.seed(SEED)
+        tf.random.set_seed(SEED)
+
+    epRewards = []
+
+    env = VecLunarLander(NUM_ENVS, numSteps, seed=SEED, backend=PHYSICS_BACKEND, actionRepeat=ACTION_REPEAT)
+    testEnv = LunarLanderEnvironment(seed=SEED, actionRepeat=ACTION_REPEAT) if RENDER_TESTS else None
+    evaluator = AsyncEvaluator(TEST_EPISODES, maxSteps=numSteps, test=False, actionRepeat=ACTION_REPEAT) if not RENDER_TESTS else None
+    registry = CheckpointRegistry('./lunar_lander_models')
+    best = registry.best(MODEL_NAME) if RESUME_BEST else None
+    bestAvgReward = best['score'] if best else -float('inf')
+    replayDirectory = "./lunar_lander_models/" + MODEL_NAME + ".replay" if PERSIST_REPLAY else None
+    agent = DQN(env.stateSpaceSize, env.actionSpaceSize, loadModel=best['path'] if best else None, alpha=ALPHA, gamma=GAMMA, replayMemorySize=REPLAY_MEMORY_SIZE, replayBatchSize=REPLAY_BATCH_SIZE, prioritizedReplay=PRIORITIZED_REPLAY, perAlpha=PER_ALPHA, perBeta=PER_BETA, perBetaIncrement=PER_BETA_INCREMENT, replayDirectory=replayDirectory, doubleDQN=DOUBLE_DQN, dueling=DUELING, nSteps=N_STEPS, updateRatio=UPDATE_RATIO, targetUpdate=TARGET_UPDATE, targetUpdateEvery=TARGET_UPDATE_EVERY, tau=TAU)
+    if len(agent.replay_memory):
+        print(f"Resuming with {len(agent.replay_memory)} transitions in replay memory")
+    actorPool = ActorPool(NUM_ACTORS, numSteps, seed=SEED or 0, actionRepeat=ACTION_REPEAT) if NUM_ACTORS else None
+    saver = BackgroundSaver(agent.createModel(), registry, KEEP_TOP_CHECKPOINTS, agent.replay_memory) ## Same architecture as the agent, resumed or new
+    profiler = Profiler(PROFILE_PATH) if PROFILE else None
+    if profiler:
+        if actorPool:
+            print("PROFILE with NUM_ACTORS > 0 only times the learner: the environments step in the actor processes")
+        for profiledEnv in env.envs + ([testEnv] if testEnv else []):
+            profiler.wrap(profiledEnv, ['step', 'reset', 'stepPhysics', 'getStateReward', 'getTermination', 'render'], 'env.')
+        if env.physics: ## The numpy backend has no per-lander envs, its batched phases are timed instead
+            profiler.wrap(env.physics, ['step', 'reset', 'solveContacts', 'getTermination', 'getStates', 'getRewards'], 'numpy.')
+        profiler.wrap(agent, ['selectAction', 'selectActions', 'rememberBatch', 'train', 'computeTargets'], 'dqn.')
+    episode = best['episode'] + 1 if best and best['episode'] else 1 ## Resumed runs carry on down the epsilon schedule
+    epsilon = beginEpisode(episode)
+    states = env.reset()
+
+    while episode <= numEpisodes:
+        if actorPool:
+            finishedInfos = actorPool.collect(agent)
+        else:
+            actions = agent.selectActions(states, epsilon)
+            nextStates, rewards, dones, infos = env.step(actions)
+            agent.rememberBatch(states, actions, rewards, nextStates, dones)
+            states = env.states
+            finishedInfos = [infos[i] for i in np.flatnonzero(dones)]
+        agent.trainPending() ## UPDATE_RATIO gradient steps for each transition just remembered, target updates follow them
+
+        for info in finishedInfos:
+            print(f"Abort status: {info['abortStatus']}")
+            epRewards.append(info['episodeReward'])
+            avgReward = info['episodeReward'] / info['episodeSteps']
+            if verbose: print(f"Episode {episode} finished after {info['episodeSteps']} steps, avgReward: {avgReward}")
+            if evaluator:
+                collectTests()
+            if profiler:
+                profiler.report(f"Episode {episode}")
+
+            episode += 1
+            if episode > numEpisodes:
+                break
+            epsilon = beginEpisode(episode)
+
+    if evaluator:
+        collectTests(wait=True)
+        evaluator.close()
+    if actorPool:
+        actorPool.close()
+    saver.close()
+    agent.replay_memory.flush()
@@ -0,0 +1,34 @@
+## Rank saved models by headless evaluation over a fixed set of seeded episodes
+## Usage: python lunar_lander-evaluate.py [model paths...] [--episodes 200] [--seed 0] [--workers N] [--repeat 1] [--json out.json]
+##        (defaults to every .model in lunar_lander_models/)
+import os
+import glob
+import json
+import argparse
+
+from Evaluation import evaluate
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Evaluate saved lunar lander models")
+    parser.add_argument('checkpoints', nargs='*')
+    parser.add_argument('--episodes', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--steps', type=int, default=600)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--repeat', type=int, default=1, help="Action repeat the models were trained with")
+    parser.add_argument('--json', default=None)
+    args = parser.parse_args()
+
+    checkpoints = args.checkpoints or sorted(glob.glob('./lunar_lander_models/*.model'))
+    summaries = evaluate(checkpoints, numEpisodes=args.episodes, seed=args.seed, maxSteps=args.steps, numWorkers=args.workers, actionRepeat=args.repeat)
+    ranked = sorted(summaries.items(), key=lambda item: item[1]['meanAvgReward'], reverse=True)
+
+    print(f"{'avgReward': >10} {'±95%': >7} {'success': >8} {'crashed': >8} {'oob': >5} {'timeout': >8} {'steps to land': >14}  model")
+    for checkpoint, summary in ranked:
+        counts = summary['statusCounts']
+        stepsToLand = f"{summary['meanStepsToLand']:.1f}" if summary['meanStepsToLand'] is not None else '-'
+        print(f"{summary['meanAvgReward']: >10.2f} {summary['ci95']: >7.2f} {summary['successRate']: >8.1%} {counts['crashed']: >8} {counts['out_of_bounds']: >5} {counts['time_out']: >8} {stepsToLand: >14}  {os.path.basename(checkpoint)}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(summaries, f, indent=1)
@@ -0,0 +1,11 @@
+## Export saved Keras checkpoints to compact NumPy .npz weights files for Policy
+## Usage: python lunar_lander-export.py [model paths...]   (defaults to every .model in lunar_lander_models/)
+import sys
+import glob
+
+from Policy import exportModel
+
+if __name__ == '__main__':
+    modelPaths = sys.argv[1:] or sorted(glob.glob('./lunar_lander_models/*.model'))
+    for modelPath in modelPaths:
+        print(f"Exported {exportModel(modelPath)}")
@@ -0,0 +1,64 @@
+## Record seeded evaluation episodes of a saved model offscreen, as PNG sequences or videos, faster than real time
+## Usage: python lunar_lander-record.py model_path [--episodes 5] [--seed 0] [--format png|mp4] [--out dir] [--workers N]
+##        (mp4 needs imageio and imageio-ffmpeg, png needs only pygame)
+import os
+import argparse
+import multiprocessing as mp
+
+from LunarLanderEnvironment import LunarLanderEnvironment, initialConditionBank
+from Policy import Policy
+from Recorder import EpisodeRecorder
+
+#===========================================================================================
+### Helper functions
+#===========================================================================================
+def recordEpisode(task):
+    checkpoint, scenario, initialCondition, path, maxSteps, test, actionRepeat = task
+    policy = Policy.load(checkpoint)
+    env = LunarLanderEnvironment(actionRepeat=actionRepeat)
+    nextState = env.reset(test=test, initialCondition=initialCondition)
+    recorder = EpisodeRecorder(env, path)
+
+    step = 0
+    epReward = 0
+    done = False
+    recorder.capture(f"Scenario {scenario}")
+    while not done:
+        state = nextState
+        action = policy.selectAction(state)
+        nextState, reward, done, info = env.step(action, step, maxSteps)
+        step += 1
+        epReward += reward
+        recorder.capture(f"Scenario {scenario}   Step {step}   Reward: {reward: >8.2f}")
+    frames = recorder.close()
+    return scenario, path, frames, epReward / step, info['abortStatus']
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Record lunar lander episodes offscreen")
+    parser.add_argument('checkpoint')
+    parser.add_argument('--episodes', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--steps', type=int, default=600)
+    parser.add_argument('--repeat', type=int, default=1, help="Action repeat the model was trained with")
+    parser.add_argument('--format', choices=['png', 'mp4', 'gif'], default='png')
+    parser.add_argument('--out', default='./lunar_lander_recordings')
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args()
+
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy') ## Nothing is shown, so no display is needed
+    name = os.path.splitext(os.path.basename(args.checkpoint))[0]
+    tasks = []
+    for scenario, initialCondition in enumerate(initialConditionBank(args.episodes, args.seed)):
+        path = os.path.join(args.out, f"{name}-scenario{scenario}" + ('' if args.format == 'png' else '.' + args.format))
+        tasks.append((args.checkpoint, scenario, initialCondition, path, args.steps, True, args.repeat))
+    os.makedirs(args.out, exist_ok=True)
+
+    numWorkers = min(args.workers or os.cpu_count(), len(tasks))
+    if numWorkers > 1:
+        with mp.get_context('spawn').Pool(numWorkers) as pool:
+            results = pool.map(recordEpisode, tasks)
+    else:
+        results = [recordEpisode(task) for task in tasks]
+
+    for scenario, path, frames, avgReward, abortStatus in results:
+        print(f"Scenario {scenario}: {frames} frames, avgReward {avgReward: >8.2f}, {abortStatus}  -> {path}")
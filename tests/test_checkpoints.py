@@ -0,0 +1,47 @@
+## Run from the repo root: python -m pytest tests
+import os
+
+from CheckpointRegistry import CheckpointRegistry, MANIFEST_NAME
+
+def test_registry_writes_manifest_only_on_add(tmp_path):
+    legacyName = 'config-avg12.5avg.model'
+    (tmp_path / legacyName).write_bytes(b'')
+    registry = CheckpointRegistry(str(tmp_path))
+    assert registry.best('config')['score'] == 12.5
+    assert not os.path.exists(tmp_path / MANIFEST_NAME)
+
+    registry.add(str(tmp_path / 'config-new.model'), 'config', 7, 20.0)
+    reopened = CheckpointRegistry(str(tmp_path))
+    assert [entry['file'] for entry in reopened.list('config')] == ['config-new.model', legacyName]
+
+def test_prune_keeps_imported_checkpoints(tmp_path):
+    legacyName = 'config-avg50.0avg.model' ## Scores below every run's, yet it is shipped with the repo
+    (tmp_path / legacyName).write_bytes(b'')
+    registry = CheckpointRegistry(str(tmp_path))
+    for episode, score in [(7, 60.0), (14, 80.0), (21, 70.0)]:
+        path = tmp_path / f'config-avg{score}avg.model'
+        path.write_bytes(b'')
+        registry.add(str(path), 'config', episode, score)
+    removed = registry.prune('config', 1)
+    assert sorted(entry['file'] for entry in removed) == ['config-avg60.0avg.model', 'config-avg70.0avg.model']
+    assert os.path.exists(tmp_path / legacyName)
+    assert [entry['file'] for entry in CheckpointRegistry(str(tmp_path)).list('config')] == ['config-avg80.0avg.model', legacyName]
+
+def test_background_saver_round_trip(tmp_path):
+    import numpy as np
+    from DQN import DQN
+    from Policy import Policy
+    from BackgroundSaver import BackgroundSaver
+
+    agent = DQN(4, 6)
+    registry = CheckpointRegistry(str(tmp_path))
+    saver = BackgroundSaver(agent.createModel(), registry)
+    path = str(tmp_path / 'config-avg3.0avg.model')
+    saver.save(agent.model.get_weights(), path, 'config', 5, 3.0)
+    saver.close()
+
+    states = np.random.default_rng(0).normal(size=(16, 4)).astype(np.float32)
+    np.testing.assert_allclose(Policy.load(path).predict(states), agent.model.predict_on_batch(states), atol=1e-5)
+    entry = CheckpointRegistry(str(tmp_path)).best('config')
+    assert (entry['file'], entry['episode'], entry['score']) == ('config-avg3.0avg.model', 5, 3.0)
+    assert sorted(os.listdir(tmp_path)) == sorted([MANIFEST_NAME, 'config-avg3.0avg.model']) ## No temp files left behind
@@ -0,0 +1,51 @@
+## Run from the repo root: python -m pytest tests
+import glob
+import numpy as np
+import pytest
+
+from DQN import DQN
+from Policy import Policy
+
+SHIPPED_CHECKPOINTS = sorted(glob.glob('./lunar_lander_models/*.model'))
+
+@pytest.mark.skipif(not SHIPPED_CHECKPOINTS, reason="No saved models")
+def test_loadModel_restores_checkpoint():
+    agent = DQN(4, 6, loadModel=SHIPPED_CHECKPOINTS[0], hiddenLayers=(5,)) ## Layer sizes come from the checkpoint
+    states = np.random.default_rng(0).normal(size=(16, 4)).astype(np.float32)
+    expected = Policy.load(SHIPPED_CHECKPOINTS[0]).predict(states)
+    np.testing.assert_allclose(agent.model.predict_on_batch(states), expected, atol=1e-5)
+    np.testing.assert_allclose(agent.targetModel.predict_on_batch(states), expected, atol=1e-5)
+
+def test_dueling_checkpoint_round_trip(tmp_path):
+    agent = DQN(4, 6, dueling=True)
+    path = str(tmp_path / 'dueling.h5')
+    agent.model.save(path)
+    states = np.random.default_rng(0).normal(size=(16, 4)).astype(np.float32)
+    expected = agent.model.predict_on_batch(states)
+    np.testing.assert_allclose(Policy.load(path).predict(states), expected, atol=1e-5) ## Folded into a plain MLP
+    resumed = DQN(4, 6, loadModel=path)
+    assert resumed.dueling
+    np.testing.assert_allclose(resumed.model.predict_on_batch(states), expected, atol=1e-5)
+
+def fillReplay(agent, numTransitions=64):
+    rng = np.random.default_rng(1)
+    states = rng.normal(size=(numTransitions, 4)).astype(np.float32)
+    agent.rememberBatch(states, rng.integers(0, 6, numTransitions), rng.normal(size=numTransitions),
+                        states + 0.1, np.zeros(numTransitions, dtype=bool))
+
+def test_hard_target_update_copies_online_weights():
+    agent = DQN(4, 6, replayBatchSize=16, targetUpdate='hard', targetUpdateEvery=2)
+    fillReplay(agent)
+    agent.train()
+    assert not all(np.array_equal(target, online) for target, online in zip(agent.targetModel.get_weights(), agent.model.get_weights()))
+    agent.train() ## Gradient step 2 copies the online network into the target
+    for target, online in zip(agent.targetModel.get_weights(), agent.model.get_weights()):
+        np.testing.assert_array_equal(target, online)
+
+def test_soft_target_update_blends_towards_online_weights():
+    agent = DQN(4, 6, replayBatchSize=16, targetUpdate='soft', tau=0.25)
+    fillReplay(agent)
+    before = agent.targetModel.get_weights()
+    agent.train()
+    for target, old, online in zip(agent.targetModel.get_weights(), before, agent.model.get_weights()):
+        np.testing.assert_allclose(target, old + 0.25 * (online - old), atol=1e-6)
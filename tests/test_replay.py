@@ -0,0 +1,120 @@
+## Run from the repo root: python -m pytest tests
+import numpy as np
+
+from ReplayBuffer import ReplayBuffer, PrioritizedReplayBuffer
+
+GAMMA = 0.9
+
+#===========================================================================================
+### Helper functions
+#===========================================================================================
+class History():
+    ## Every transition written to a buffer, by write count, to compute n-step returns the slow way
+    def __init__(self, buffer):
+        self.buffer = buffer
+        self.streams, self.rewards, self.dones = [], [], []
+
+    def add(self, streams, rewards, dones):
+        self.streams += list(streams)
+        self.rewards += list(rewards)
+        self.dones += list(dones)
+
+    def nextState(self, count): ## Each write's nextState records its count, to check where a return stopped
+        return np.full(self.buffer.stateSize, count, dtype=np.float32)
+
+    def nStep(self, slot, nSteps): ## Follows the slot's stream through later writes that are still live
+        added = len(self.streams)
+        count = max(c for c in range(slot, added, self.buffer.capacity))
+        ret, discount = self.rewards[count], GAMMA
+        for k in range(1, nSteps):
+            if self.dones[count]:
+                break
+            later = [c for c in range(count + 1, added) if self.streams[c] == self.streams[count]]
+            if not later:
+                break
+            count = later[0]
+            ret += discount * self.rewards[count]
+            discount *= GAMMA
+        return ret, discount, count, self.dones[count]
+
+def addRows(buffer, history, rng, streams, numRows): ## streams as for addBatch
+    rewards = rng.normal(size=numRows).astype(np.float32)
+    dones = rng.random(numRows) < 0.15
+    rowStreams = np.arange(numRows) if streams is None else np.broadcast_to(streams, numRows)
+    counts = len(history.streams) + np.arange(numRows)
+    nextStates = np.stack([history.nextState(count) for count in counts])
+    states = np.zeros((numRows, buffer.stateSize), dtype=np.float32)
+    buffer.addBatch(states, np.zeros(numRows, dtype=np.int64), rewards, nextStates, dones, streams)
+    history.add(rowStreams, rewards, dones)
+
+def assertMatchesHistory(buffer, history, nSteps):
+    indices = np.arange(len(buffer))
+    states, actions, returns, nextStates, dones, discounts = buffer.getNStepBatch(indices, nSteps, GAMMA)
+    for slot in indices:
+        ret, discount, lastCount, done = history.nStep(slot, nSteps)
+        np.testing.assert_allclose(returns[slot], ret, rtol=1e-5, atol=1e-6)
+        np.testing.assert_allclose(discounts[slot], discount, rtol=1e-5)
+        assert nextStates[slot, 0] == lastCount and dones[slot] == done
+
+#===========================================================================================
+### Tests
+#===========================================================================================
+def test_nstep_returns_follow_interleaved_streams():
+    rng = np.random.default_rng(0)
+    buffer = ReplayBuffer(50, 2)
+    history = History(buffer)
+    for batch in range(200): ## Wraps the ring many times, evicting the heads of every stream's runs
+        streams = rng.permutation(3) if batch % 2 else None ## None is one row per stream, as from VecLunarLander
+        addRows(buffer, history, rng, streams, 3)
+        assertMatchesHistory(buffer, history, 3)
+
+def test_nstep_returns_follow_actor_chunks_and_single_adds():
+    rng = np.random.default_rng(1)
+    buffer = PrioritizedReplayBuffer(50, 2)
+    history = History(buffer)
+    for batch in range(150):
+        if batch % 3 == 2: ## One transition through add(), as the single-lander loop does
+            stream = int(rng.integers(0, 4))
+            reward, done = float(rng.normal()), bool(rng.random() < 0.15)
+            buffer.add(np.zeros(2), 0, reward, history.nextState(len(history.streams)), done, stream)
+            history.add([stream], [reward], [done])
+        else: ## A chunk from one actor, a single int stream for all its rows
+            addRows(buffer, history, rng, int(rng.integers(0, 4)), int(rng.integers(1, 8)))
+        assertMatchesHistory(buffer, history, 4)
+
+def test_evicted_stream_tail_is_not_linked():
+    buffer = ReplayBuffer(4, 2)
+    history = History(buffer)
+    rng = np.random.default_rng(2)
+    addRows(buffer, history, rng, 0, 1)
+    addRows(buffer, history, rng, 1, 4) ## Overwrites stream 0's only transition
+    addRows(buffer, history, rng, 0, 1)
+    assert buffer.nextIndices[0] != 1 ## Slot 0 now holds stream 1, which must not run on into stream 0
+    assertMatchesHistory(buffer, history, 3)
+
+def test_unlinked_buffer_gives_one_step_returns():
+    rng = np.random.default_rng(3)
+    buffer = ReplayBuffer(20, 2, linked=False)
+    history = History(buffer)
+    for batch in range(30):
+        addRows(buffer, history, rng, None, 3)
+    assert (buffer.nextIndices == -1).all()
+    assertMatchesHistory(buffer, history, 1)
+
+def test_reopened_buffer_drops_links_written_after_flush(tmp_path):
+    rng = np.random.default_rng(4)
+    buffer = ReplayBuffer(8, 2, directory=str(tmp_path))
+    history = History(buffer)
+    for step in range(5):
+        addRows(buffer, history, rng, 0, 1)
+    buffer.flush()
+    addRows(buffer, history, rng, 0, 1) ## Written while the saver thread syncs the arrays: links slot 4 to slot 5
+    for mmap in buffer.mmaps:
+        mmap.flush()
+
+    reopened = ReplayBuffer(8, 2, directory=str(tmp_path))
+    assert (reopened.index, len(reopened)) == (5, 5)
+    assert reopened.nextIndices[4] == -1
+    np.testing.assert_array_equal(reopened.nextIndices[:4], buffer.nextIndices[:4]) ## Links within the snapshot stay
+    reopened.addBatch(np.zeros((1, 2)), [0], [1.0], np.zeros((1, 2)), [False], 1) ## Another stream takes slot 5
+    np.testing.assert_allclose(reopened.getNStepBatch(np.array([4]), 3, GAMMA)[5], [GAMMA]) ## Slot 4's return stops at its own reward